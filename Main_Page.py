@@ -1,19 +1,37 @@
 import streamlit as st
-from graphy.generator import GraphGenerator
+from graphy.cache import SolutionCache
+from graphy.flow import DynamicCut
+from graphy.pool import InstancePool
 from graphy.solvers import SolverWaterDistribution, SolverMilitaryDistribution
 
 
 # Initial page settings
 st.set_page_config(page_title="Main Page", layout="centered", initial_sidebar_state="expanded")
 
+# Solutions are shared by all sessions of the app and kept on disk between runs
+@st.experimental_singleton
+def solution_cache():
+    return SolutionCache("solutions.sqlite", symmetries=True)
+
+# Networks are generated and solved in the background, so that "Update" and "Solve" do not wait for the solver
+@st.experimental_singleton
+def instance_pool(kind):
+    return InstancePool(kind, cache=solution_cache())
+
 # Instantiating relevant variables
-st.session_state.generator = GraphGenerator()
+st.session_state.water_solver = SolverWaterDistribution(cache=solution_cache())
+st.session_state.military_solver = SolverMilitaryDistribution(cache=solution_cache())
+
+st.session_state.water_pool = instance_pool("water")
+st.session_state.military_pool = instance_pool("military")
 
-st.session_state.water_solver = SolverWaterDistribution()
-st.session_state.military_solver = SolverMilitaryDistribution()
+# Each network comes with its optimal solution, kept until the network changes
+water_network, st.session_state.water_solution = st.session_state.water_pool.pop()
+military_network, st.session_state.military_solution = st.session_state.military_pool.pop()
 
-st.session_state.water_network = st.session_state.generator.water_network()
-st.session_state.military_network = st.session_state.generator.military_network()
+st.session_state.water_network = water_network.to_networkx()
+st.session_state.military_network = military_network.to_networkx()
+st.session_state.water_cut = DynamicCut(st.session_state.water_network)  # what-if removals of the water page
 
 st.session_state.disabled = False
 
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+
+# Root of the repository, so that the graphy package is imported from the tree and not from an installation
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statements timed in fresh interpreters, with the time budget in seconds and the modules they must not load
+cases = [("import graphy", 0.05, ("numpy", "networkx", "mip", "matplotlib", "PIL")),
+         ("from graphy import GraphGenerator", 0.5, ("networkx", "mip", "matplotlib", "PIL")),
+         ("from graphy import GridNetwork", 0.5, ("networkx", "mip", "matplotlib", "PIL")),
+         ("from graphy import SolverWaterDistribution", 1.5, ("matplotlib", "PIL")),
+         ("from graphy.utils import water_network_png", 3.0, ("mip",))]
+
+# Code run by each child: it times the statement and reports which of the heavy modules were loaded
+child = """
+import sys, time, json
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+# Function that measures the cold import time of a statement as the median over fresh processes
+def measure(statement, heavy, repeat=5):
+    times, loaded = [], set()
+
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", child.format(statement=statement, heavy=heavy)],
+                                cwd=root, capture_output=True, text=True, check=True).stdout
+        elapsed, modules = json.loads(output.splitlines()[-1])
+
+        times.append(elapsed)
+        loaded.update(modules)
+
+    return statistics.median(times), sorted(loaded)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of the graphy package")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per statement")
+    args = parser.parse_args()
+
+    failed = False
+    for statement, budget, heavy in cases:
+        elapsed, loaded = measure(statement, heavy, args.repeat)
+        ok = elapsed <= budget and not loaded
+        failed |= not ok
+
+        print(f"{'ok  ' if ok else 'FAIL'} {elapsed*1000:8.1f} ms (budget {budget*1000:.0f} ms)  {statement}"
+              + (f"  loaded {', '.join(loaded)}" if loaded else ""))
+
+    # A non-zero exit status lets the benchmark be used as a regression check
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
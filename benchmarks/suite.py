@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+# Root of the repository, so that the graphy package is imported from the tree and not from an installation
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import matplotlib
+matplotlib.use("Agg")  # rendering without a display
+
+import numpy as np
+import matplotlib.pyplot as plt
+from graphy.evaluate import CutEvaluator
+from graphy.generator import GraphGenerator
+from graphy.solvers import SolverWaterDistribution, SolverMilitaryDistribution
+from graphy.utils import plot_water_network, plot_military_network
+
+
+# Grid sizes of each kind of network (military models grow much faster, so their grids stay smaller)
+sizes = {"water" : (100, 400, 900),
+         "military" : (100, 225, 400)}
+
+# Larger grids, up to 100x100 cells, that only go through the stages that do not solve a model
+large_sizes = {"water" : (2500, 10000),
+               "military" : (2500, 10000)}
+
+seeds = (0, 1, 2)
+fire_power = 6
+candidates = 256  # random attempts scored by the evaluation stage, besides the optimal one
+
+stages = ("generate", "create_model", "optimize", "plot", "evaluate")
+large_stages = ("generate", "plot")
+
+# The solvers are timed with their default models (presolve=False) and with the reduced models that the
+# pools and batches build (presolve=True), the second only for the stages that depend on it
+presolves = (False, True)
+presolve_stages = ("create_model", "optimize")
+
+
+# Function that runs the stages of one network, calling measure(stage, function) around each of them
+# Without solve, the network is only generated and plotted
+def pipeline(kind, N, seed, measure, solve=True, presolve=False):
+    generator = GraphGenerator(N, seed)
+
+    def plot():
+        fig = plot_water_network(G) if kind == "water" else plot_military_network(G)
+        fig.savefig(os.devnull, format="png")
+        plt.close(fig)
+
+    if not solve:
+        G = measure("generate", generator.water_network if kind == "water" else generator.military_network)
+        measure("plot", plot)
+        return
+
+    if kind == "water":
+        G = measure("generate", generator.water_network)
+        solver = SolverWaterDistribution(presolve=presolve)
+        measure("create_model", lambda: solver.create_model(G))
+    else:
+        G = measure("generate", generator.military_network)
+        solver = SolverMilitaryDistribution(presolve=presolve)
+        measure("create_model", lambda: solver.create_model(G, fire_power))
+
+    if solver.model is not None:
+        solver.model.verbose = 0
+
+    measure("optimize", solver.optimize)
+    measure("plot", plot)
+
+    # Attempts of the same size as the optimal cut, scored as the pages of the app do
+    rng = np.random.default_rng(seed)
+    if kind == "water":
+        edges = list(G.edges)
+        picks = [rng.choice(len(edges), size=len(solver.edges_to_remove), replace=False) for _ in range(candidates)]
+        attempts = [solver.edges_to_remove] + [[edges[i] for i in pick] for pick in picks]
+    else:
+        nodes = list(G.nodes)
+        attempts = [solver.nodes_to_remove] + [rng.choice(nodes, size=len(solver.nodes_to_remove),
+                                                          replace=False).tolist() for _ in range(candidates)]
+
+    measure("evaluate", lambda: CutEvaluator(G, fire_power, solver.objective_value).evaluate(attempts))
+
+# Function that gives the time of each stage of a network and, in a second run, its peak traced memory
+# (tracemalloc only sees the allocations of Python, not the ones made inside CBC)
+def run(kind, N, seed, solve=True, presolve=False):
+    times, peaks = {}, {}
+
+    def timed(stage, function):
+        start = time.perf_counter()
+        result = function()
+        times[stage] = time.perf_counter() - start
+        return result
+
+    def traced(stage, function):
+        tracemalloc.start()
+        try:
+            result = function()
+            peaks[stage] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+
+    pipeline(kind, N, seed, timed, solve, presolve)
+    pipeline(kind, N, seed, traced, solve, presolve)
+
+    return times, peaks
+
+# Function that runs every network of the suite and keeps the median time and the largest peak of each stage
+def benchmark(kinds, grid_sizes, large_grid_sizes, seeds):
+    results = []
+
+    for kind in kinds:
+        # A first untimed run, so that loading CBC and the fonts is not charged to the first network
+        for presolve in presolves:
+            pipeline(kind, 100, seeds[0], lambda stage, function: function(), presolve=presolve)
+
+        grids = [(N, True, presolve) for N in (sizes[kind] if grid_sizes is None else grid_sizes)
+                 for presolve in presolves] + \
+                [(N, False, False) for N in (large_sizes[kind] if large_grid_sizes is None else large_grid_sizes)]
+
+        for N, solve, presolve in grids:
+            runs = [run(kind, N, seed, solve, presolve) for seed in seeds]
+
+            for stage in (presolve_stages if presolve else stages) if solve else large_stages:
+                result = {"kind" : kind, "N" : N, "presolve" : presolve, "stage" : stage,
+                          "time" : statistics.median(times[stage] for times, _ in runs),
+                          "peak_memory" : max(peaks[stage] for _, peaks in runs)}
+                results.append(result)
+
+                print(f"{kind:9s} {N:5d} {'presolve' if presolve else '':8s} {stage:13s} "
+                      f"{result['time']*1000:10.1f} ms {result['peak_memory']/2**20:8.1f} MiB", file=sys.stderr)
+
+    return results
+
+# Function that lists the stages that got slower than the baseline by more than the threshold (a fraction)
+# Very fast stages are compared with an absolute margin as well, since their times are mostly noise
+def regressions(results, baseline, threshold, margin=0.005):
+    previous = {(r["kind"], r["N"], r.get("presolve"), r["stage"]) : r for r in baseline["results"]}
+    slower = []
+
+    for result in results:
+        before = previous.get((result["kind"], result["N"], result["presolve"], result["stage"]))
+
+        if before is not None and result["time"] > before["time"]*(1 + threshold) + margin:
+            slower.append((result, before))
+
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory of the stages of the graphy package")
+    parser.add_argument("--kinds", nargs="+", choices=tuple(sizes), default=tuple(sizes))
+    parser.add_argument("--sizes", nargs="+", type=int, help="grid sizes (number of cells) for every kind")
+    parser.add_argument("--large-sizes", nargs="*", type=int,
+                        help="grid sizes for every kind that are only generated and plotted (none when empty)")
+    parser.add_argument("--seeds", nargs="+", type=int, default=seeds)
+    parser.add_argument("--output", help="JSON file for the results (printed when not given)")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown over the baseline that fails")
+    args = parser.parse_args()
+
+    report = {"python" : platform.python_version(),
+              "numpy" : np.__version__,
+              "machine" : platform.machine(),
+              "seeds" : args.seeds,
+              "results" : benchmark(args.kinds, args.sizes, args.large_sizes, args.seeds)}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline is None:
+        return
+
+    with open(args.baseline) as file:
+        slower = regressions(report["results"], json.load(file), args.threshold)
+
+    for result, before in slower:
+        print(f"FAIL {result['kind']} {result['N']} {'presolve ' if result['presolve'] else ''}{result['stage']}: "
+              f"{before['time']*1000:.1f} ms -> {result['time']*1000:.1f} ms", file=sys.stderr)
+
+    # A non-zero exit status lets the suite be used as a regression check
+    sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
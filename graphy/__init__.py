@@ -1,3 +1,34 @@
-from .generator import GraphGenerator
-from .solvers import SolverWaterDistribution, SolverMilitaryDistribution
-from .utils import plot_water_network, plot_military_network, interrupt_flow, interrupt_supply
\ No newline at end of file
+import importlib
+
+
+# Public names of the package and the submodule that defines each of them
+# Submodules are only imported when one of their names is first used, so importing graphy does not load
+# python-mip, matplotlib or networkx until they are needed
+exports = {"GraphGenerator" : "generator",
+           "MilitaryHeuristic" : "heuristics",
+           "GridNetwork" : "network",
+           "SolverWaterDistribution" : "solvers",
+           "SolverMilitaryDistribution" : "solvers",
+           "save_network" : "storage",
+           "load_network" : "storage",
+           "save_corpus" : "storage",
+           "load_corpus" : "storage",
+           "plot_water_network" : "utils",
+           "plot_military_network" : "utils",
+           "interrupt_flow" : "utils",
+           "interrupt_supply" : "utils"}
+
+__all__ = list(exports)
+
+
+def __getattr__(name):
+    if name not in exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{exports[name]}", __name__), name)
+    globals()[name] = value  # later lookups do not go through __getattr__
+
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(exports))
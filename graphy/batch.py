@@ -0,0 +1,110 @@
+import os
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .cache import SolutionCache
+from .generator import GraphGenerator
+from .solvers import SolverWaterDistribution, SolverMilitaryDistribution
+
+
+# Columns of the result files (the cut is a list of edges for water networks and of nodes for military networks)
+columns = [("instance_id", pa.int64()),
+           ("seed", pa.int64()),  # seed of the network (see GraphGenerator.seeded)
+           ("n_cells", pa.int32()),
+           ("n_nodes", pa.int32()),
+           ("n_edges", pa.int32()),
+           ("objective", pa.float64()),
+           ("disconnected", pa.int32()),
+           ("generate_time", pa.float64()),
+           ("build_time", pa.float64()),
+           ("solve_time", pa.float64())]
+
+schemas = {"water" : pa.schema(columns + [("cut", pa.list_(pa.list_(pa.int32(), 2)))]),
+           "military" : pa.schema(columns + [("cut", pa.list_(pa.int32()))])}
+
+
+# Function that generates, builds and solves a chunk of instances inside a worker process
+# Instance i always uses the stream spawned with key i from the batch entropy, whatever the worker
+# With cache_path the solutions are looked up in and stored to a SQLite file shared by all workers
+def solve_chunk(kind, instance_ids, entropy, N=100, fire_power=6, backend="mip", cache_path=None):
+    generator = GraphGenerator(N)
+    results = {name : [] for name in schemas[kind].names}
+    cache = None if cache_path is None else SolutionCache(cache_path, symmetries=True)
+
+    for i in instance_ids:
+        generator.rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(i,)))
+
+        start = time.perf_counter()
+        if kind == "water":
+            network = generator.water_grid()
+            solver = SolverWaterDistribution(backend, cache=cache, presolve=True)  # each network is solved once
+        else:
+            network = generator.military_grid()
+            solver = SolverMilitaryDistribution(cache=cache, presolve=True)
+        generated = time.perf_counter()
+
+        if kind == "water":
+            solver.create_model(network)
+        else:
+            solver.create_model(network, fire_power)
+
+        if solver.model is not None:
+            solver.model.verbose = 0
+        built = time.perf_counter()
+
+        solver.optimize()
+        solved = time.perf_counter()
+
+        results["instance_id"].append(i)
+        results["seed"].append(network.seed)
+        results["n_cells"].append(N)
+        results["n_nodes"].append(network.number_of_nodes())
+        results["n_edges"].append(network.number_of_edges())
+        results["objective"].append(solver.objective_value)
+        results["disconnected"].append(len(solver.disconnected_nodes))
+        results["generate_time"].append(generated - start)
+        results["build_time"].append(built - generated)
+        results["solve_time"].append(solved - built)
+        results["cut"].append(solver.edges_to_remove if kind == "water" else solver.nodes_to_remove)
+
+    if cache is not None:
+        cache.close()
+
+    return results
+
+# Function that spreads generate -> build -> solve jobs across a process pool and streams the results to Parquet
+# Only a bounded number of chunks is in flight, so memory does not grow with the number of instances
+def run_batch(path, n_instances, kind="water", N=100, fire_power=6, seed=None,
+              workers=None, chunk_size=64, backend="mip", cache_path=None):
+    if kind not in schemas:
+        raise ValueError(f"kind must be one of {tuple(schemas)}, got {kind!r}")
+
+    schema = schemas[kind]
+    workers = workers or os.cpu_count()
+    entropy = np.random.SeedSequence(seed).entropy  # recorded so that a run with seed=None can be repeated
+
+    chunks = (range(start, min(start + chunk_size, n_instances))
+              for start in range(0, n_instances, chunk_size))
+
+    writer = pq.ParquetWriter(path, schema)
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            pending = set()
+
+            for chunk in chunks:
+                if len(pending) >= 2*workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        writer.write_table(pa.Table.from_pydict(future.result(), schema=schema))
+
+                pending.add(pool.submit(solve_chunk, kind, chunk, entropy, N, fire_power, backend,
+                                           cache_path))
+
+            for future in wait(pending).done:
+                writer.write_table(pa.Table.from_pydict(future.result(), schema=schema))
+    finally:
+        writer.close()
+
+    return entropy
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import numpy as np
+
+
+# Senses of the rows as written in an LP file
+senses = {"<=" : b" <= ", ">=" : b" >= ", "=" : b" = "}
+
+chunk_size = 1 << 14  # rows written at a time, so that the text of a large model is never all in memory
+
+
+# Function that writes numbers for an LP file (integers without a decimal point, the others in full precision)
+# Models have few distinct coefficients, so each of them is only formatted once
+def text(values):
+    unique, inverse = np.unique(np.asarray(values, dtype=float), return_inverse=True)
+
+    if np.all(unique == np.round(unique)):
+        return unique.astype(np.int64).astype("S")[inverse]
+
+    return np.char.mod(b"%.17g", unique)[inverse]
+
+# Function that writes terms as "+ c v<col>", given the names of all variables as " v<col>"
+def terms(values, cols, names):
+    return np.char.add(np.char.add(np.where(values < 0, b" - ", b" + "), text(np.abs(values))), names[cols])
+
+# Function that writes the lines of some rows of a constraint matrix in coordinate form, sorted by row
+# Rows are assembled a term at a time for all rows with the same number of terms, so the work is done by numpy
+def row_lines(first, counts, starts, cols, values, sense, rhs, names):
+    lines = np.empty(len(counts), dtype=object)
+    ids = np.arange(first, first + len(counts))
+
+    for k in np.unique(counts).tolist():
+        chosen = np.flatnonzero(counts == k)
+        line = np.char.add(np.char.add(b" r", ids[chosen].astype("S")), b":")
+
+        for j in range(k):
+            positions = starts[chosen] + j
+            line = np.char.add(line, terms(values[positions], cols[positions], names))
+
+        lines[chosen] = np.char.add(np.char.add(line, sense[chosen]), text(rhs[chosen]))
+
+    return lines.tolist()
+
+# Function that loads a whole model at once from arrays instead of adding its rows one by one
+# The model gets integer variables v0..v(n-1) between 0 and ub with the costs obj, and rows r0..r(R-1) with the
+# terms values[k]*v[cols[k]] of the rows rows[k], the sense of each row ("<=", ">=" or "=") and its rhs
+# The model is written to an LP file that CBC reads in one call, and its variables and rows are returned in order
+def load_model(model, maximize, obj, ub, rows, cols, values, sense, rhs):
+    obj, ub, rhs = np.asarray(obj, dtype=float), np.asarray(ub, dtype=float), np.asarray(rhs, dtype=float)
+    rows, cols, values = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64), \
+                         np.asarray(values, dtype=float)
+
+    sense = np.asarray(sense)
+    sense = np.select([sense == s for s in senses], list(senses.values()), b"")
+
+    n, n_rows = len(obj), len(rhs)
+
+    # Coefficients sorted by row, with the first coefficient and the number of coefficients of each row
+    order = np.argsort(rows, kind="stable")
+    cols, values = cols[order], values[order]
+    counts = np.bincount(rows, minlength=n_rows)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+    if not counts.all():
+        raise ValueError("every row of the model needs at least one term")
+
+    names = np.char.add(b" v", np.arange(n).astype("S"))
+
+    descriptor, path = tempfile.mkstemp(suffix=".lp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            # Every variable is in the objective, even with a zero cost, so the columns keep the order of the file
+            file.write(b"Maximize\n obj:" if maximize else b"Minimize\n obj:")
+            for start in range(0, n, chunk_size):
+                file.write(b"\n".join(terms(obj[start:start + chunk_size],
+                                            np.arange(start, min(start + chunk_size, n)), names).tolist()) + b"\n")
+
+            file.write(b"Subject To\n")
+            for start in range(0, n_rows, chunk_size):
+                end = min(start + chunk_size, n_rows)
+                file.write(b"\n".join(row_lines(start, counts[start:end], starts[start:end], cols, values,
+                                                sense[start:end], rhs[start:end], names)) + b"\n")
+
+            file.write(b"Bounds\n")
+            for start in range(0, n, chunk_size):
+                file.write(b"\n".join(np.char.add(np.char.add(b" 0 <=", names[start:start + chunk_size]),
+                                                  np.char.add(b" <= ", text(ub[start:start + chunk_size])))
+                                      .tolist()) + b"\n")
+
+            file.write(b"Generals\n")
+            for start in range(0, n, chunk_size):
+                file.write(b"".join(names[start:start + chunk_size].tolist()) + b"\n")
+
+            file.write(b"End\n")
+
+        model.read(path)
+    finally:
+        os.remove(path)
+
+    variables, constraints = list(model.vars), list(model.constrs)
+
+    if len(variables) != n or len(constraints) != n_rows or variables[-1].name != f"v{n - 1}":
+        raise RuntimeError("the model read back does not match the one written")
+
+    return variables, constraints
+
+# Function that gives in coordinate form the rows sum(y) - x[v] + x[w] >= 0 and sum(y) - x[w] + x[v] >= 0 of
+# every edge (v, w), rows 2k and 2k+1 being the ones of edge k and ys the columns of the y terms of each edge
+def edge_rows(tails, heads, ys):
+    tails, heads = np.asarray(tails, dtype=np.int64), np.asarray(heads, dtype=np.int64)
+    m, k = len(tails), len(ys) + 2
+
+    cols = np.stack([np.column_stack(ys + [tails, heads]), np.column_stack(ys + [heads, tails])], axis=1)
+    values = np.tile(np.r_[np.ones(len(ys)), -1, 1], 2*m)
+
+    return np.repeat(np.arange(2*m), k), cols.reshape(-1), values
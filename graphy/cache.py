@@ -0,0 +1,169 @@
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from .network import as_grid
+
+
+# Class that stores the answer of a solver: the objective value, the nodes that were disconnected and the cut
+# The cut is a list of edges (v, w) for water networks and a list of nodes for military networks
+class Solution:
+    def __init__(self, objective, disconnected, cut):
+        self.objective = objective
+        self.disconnected = list(disconnected)
+        self.cut = list(cut)
+
+    def relabel(self, mapping):
+        # Edges are given as (min, max) after relabeling, since the labels may swap their order
+        label = lambda item: tuple(sorted(mapping[v] for v in item)) if isinstance(item, (tuple, list)) \
+                             else mapping[item]
+
+        return Solution(self.objective, sorted(mapping[v] for v in self.disconnected), [label(c) for c in self.cut])
+
+    def to_json(self):
+        return json.dumps([self.objective, self.disconnected, self.cut])
+
+    @classmethod
+    def from_json(cls, text):
+        objective, disconnected, cut = json.loads(text)
+        return cls(objective, disconnected, [tuple(c) if isinstance(c, list) else c for c in cut])
+
+# Function that lists the symmetries of a rows x cols grid as permutations of its cells
+# Mirroring rows or columns keeps every grid, transposing only keeps the square ones
+def grid_symmetries(rows, cols):
+    r, c = np.divmod(np.arange(rows*cols), cols)
+    flips = [(r, c), (rows - 1 - r, c), (r, cols - 1 - c), (rows - 1 - r, cols - 1 - c)]
+
+    symmetries = [a*cols + b for a, b in flips]
+    if rows == cols:
+        symmetries += [b*cols + a for a, b in flips]
+
+    return symmetries
+
+# Function that hashes a network with its nodes relabeled by perm (original label -> new label)
+# Only what defines the optimization problem goes into the hash, the flow or provided flags do not
+def network_digest(network, perm, fire_power=None):
+    n = network.n
+    alive = network.edge_alive
+
+    u, v = perm[network.tails[alive]], perm[network.heads[alive]]
+    low, high = np.minimum(u, v), np.maximum(u, v)
+    order = np.lexsort((high, low))
+
+    nodes = np.zeros(n, dtype=bool)
+    role = np.zeros(n, dtype=np.int8)
+    endurance = np.zeros(n, dtype=np.int32)
+    nodes[perm], role[perm], endurance[perm] = network.node_alive, network.role, network.endurance
+
+    digest = hashlib.sha1(f"{network.kind}{network.shape}{fire_power}".encode())
+    for array in (low[order], high[order], network.red[alive][order], nodes, role, endurance):
+        digest.update(np.ascontiguousarray(array).tobytes())
+
+    return digest.hexdigest()
+
+# Class that caches solutions by a canonical hash of the network, in memory and optionally in a SQLite file
+# The in-memory tier keeps the size most recently used solutions, the file keeps every solution stored
+# With symmetries the hash is taken over all mirror images of the grid, so that mirrored networks share an entry
+class SolutionCache:
+    def __init__(self, path=None, size=256, symmetries=False):
+        self.path = path
+        self.size = size
+        self.symmetries = symmetries
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()  # the same cache may be shared by the sessions of the app
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0  # hits that were not in memory but were found in the file
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")  # readers do not wait for the writers of other processes
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, solution TEXT)")
+            self.connection.commit()
+
+    def key(self, network, fire_power=None):
+        # The key is the digest with the relabeling of the network into the labels of the stored solutions
+        network = as_grid(network)
+
+        if not self.symmetries:
+            return network_digest(network, np.arange(network.n), fire_power), None
+
+        return min(((network_digest(network, perm, fire_power), perm) for perm in grid_symmetries(*network.shape)),
+                   key=lambda item: item[0])
+
+    def get(self, key):
+        digest, perm = key
+
+        with self.lock:
+            solution = self.memory.get(digest)
+
+            if solution is not None:
+                self.memory.move_to_end(digest)
+            elif self.connection is not None:
+                row = self.connection.execute("SELECT solution FROM solutions WHERE key = ?", (digest,)).fetchone()
+                if row is not None:
+                    solution = Solution.from_json(row[0])
+                    self.remember(digest, solution)
+                    self.disk_hits += 1
+
+            if solution is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        if perm is None:
+            return solution
+
+        # Back from the labels of the stored solution to the labels of the network
+        inverse = np.empty_like(perm)
+        inverse[perm] = np.arange(len(perm))
+
+        return solution.relabel(inverse.tolist())
+
+    def put(self, key, solution):
+        digest, perm = key
+
+        if perm is not None:
+            solution = solution.relabel(perm.tolist())
+
+        with self.lock:
+            self.remember(digest, solution)
+
+            if self.connection is not None:
+                self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)", (digest, solution.to_json()))
+                self.connection.commit()
+
+    def remember(self, digest, solution):
+        self.memory[digest] = solution
+        self.memory.move_to_end(digest)
+
+        if len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        return self.hits / max(self.hits + self.misses, 1)
+
+    def stats(self):
+        return {"hits" : self.hits, "misses" : self.misses, "disk_hits" : self.disk_hits,
+                "hit_rate" : self.hit_rate, "memory_size" : len(self.memory)}
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM solutions")
+                self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
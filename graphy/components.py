@@ -0,0 +1,117 @@
+import numpy as np
+
+
+# Function that follows parent pointers until every node points to the root of its tree
+def compress(parent):
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
+
+# Function that runs a vectorized version of Boruvka's algorithm
+# The weight of an edge is its position, so the edges must be given sorted by weight
+# Each round hooks every component to its cheapest outgoing edge, so there are at most log2(n) rounds
+def boruvka(n, tails, heads):
+    tails = np.asarray(tails, dtype=np.int64)
+    heads = np.asarray(heads, dtype=np.int64)
+
+    m = len(tails)
+    in_forest = np.zeros(m, dtype=bool)
+
+    comp = np.arange(n)
+    ids = np.arange(m)
+    u, v = tails, heads
+
+    while True:
+        # Edges inside a component stay inside it, so they are discarded for good
+        cu, cv = comp[u], comp[v]
+        outgoing = cu != cv
+        if not outgoing.any():
+            return in_forest, comp
+
+        ids, u, v, cu, cv = ids[outgoing], u[outgoing], v[outgoing], cu[outgoing], cv[outgoing]
+
+        # Cheapest outgoing edge of each component
+        best = np.full(n, m)
+        np.minimum.at(best, cu, ids)
+        np.minimum.at(best, cv, ids)
+
+        roots = np.flatnonzero(best < m)
+        chosen = best[roots]
+        in_forest[chosen] = True
+
+        # Hooking each root to the component at the other end of its edge
+        # With distinct weights the only cycles are pairs of roots that chose the same edge
+        ct, ch = comp[tails[chosen]], comp[heads[chosen]]
+        other = np.where(ct == roots, ch, ct)
+
+        parent = np.arange(n)
+        parent[roots] = other
+
+        mutual = (parent[other] == roots) & (roots < other)
+        parent[roots[mutual]] = roots[mutual]
+
+        comp = compress(parent)[comp]
+
+# Function that computes the minimum spanning forest of edges sorted by weight
+def spanning_forest(n, tails, heads):
+    return boruvka(n, tails, heads)[0]
+
+# Function that labels the connected components of a graph given by edge arrays (a label is a node of the component)
+def connected_labels(n, tails, heads):
+    return boruvka(n, tails, heads)[1]
+
+# Function that converts edge arrays into the compressed sparse row adjacency of an undirected graph
+# Neighbors of v are indices[indptr[v]:indptr[v+1]] and edge_ids gives the edge of each entry
+def to_csr(n, tails, heads):
+    tails = np.asarray(tails, dtype=np.int32)
+    heads = np.asarray(heads, dtype=np.int32)
+
+    ends = np.concatenate([tails, heads])
+    order = np.argsort(ends, kind="stable")
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=n), out=indptr[1:])
+
+    indices = np.concatenate([heads, tails])[order]
+    edge_ids = (order % max(len(tails), 1)).astype(np.int32)
+
+    return indptr, indices, edge_ids
+
+# Function that runs one breadth-first search from source in each of K copies of a CSR graph at once
+# keep is a (K, m) boolean array with the edges that exist in each copy, and the result is a (K, n) boolean
+# array with the nodes reached in each copy (a search only takes a few array operations per level)
+def reachable(indptr, indices, edge_ids, source, keep):
+    K = len(keep)
+    n = len(indptr) - 1
+
+    reached = np.zeros((K, n), dtype=bool)
+    reached[:, source] = True
+
+    copies = np.arange(K)
+    frontier = np.full(K, source)
+    last = np.empty(K*n, dtype=np.int64)  # scratch space to drop repeated nodes without sorting
+
+    while len(frontier):
+        # All entries of the adjacency of the frontier nodes, expanded with the copy they belong to
+        starts = indptr[frontier]
+        degrees = indptr[frontier + 1] - starts
+        owner = np.repeat(np.arange(len(frontier)), degrees)
+        entries = starts[owner] + np.arange(len(owner)) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+
+        copy = copies[owner]
+        neighbor = indices[entries]
+
+        found = keep[copy, edge_ids[entries]] & ~reached[copy, neighbor]
+        flat = copy[found]*n + neighbor[found]
+
+        # A node found through several edges joins the next frontier only once
+        positions = np.arange(len(flat))
+        last[flat] = positions
+        flat = flat[last[flat] == positions]
+
+        reached.ravel()[flat] = True
+        copies, frontier = np.divmod(flat, n)
+
+    return reached
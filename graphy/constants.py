@@ -1,119 +1,37 @@
-import PIL
+import os
+from functools import lru_cache
 import numpy as np
 
 
-# Loading images that will be used in the vertices of the graph
-files = {"node_water" : "./media/node_water.png",
-         "node" : "./media/node.png",
-         "origin" : "./media/origin.png",
-         "dest" : "./media/dest.png",
-         "headquarters" : "./media/headquarters.png",
-         "base_1" : "./media/base_1.png",
-         "base_2" : "./media/base_2.png",
-         "base_3" : "./media/base_3.png"}
+# Images that will be used in the vertices of the graph (paths relative to the package, not to the working directory)
+media = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "media")
 
-images = {name : PIL.Image.open(file) for name, file in files.items()}
+files = {"node_water" : os.path.join(media, "node_water.png"),
+         "node" : os.path.join(media, "node.png"),
+         "origin" : os.path.join(media, "origin.png"),
+         "dest" : os.path.join(media, "dest.png"),
+         "headquarters" : os.path.join(media, "headquarters.png"),
+         "base_1" : os.path.join(media, "base_1.png"),
+         "base_2" : os.path.join(media, "base_2.png"),
+         "base_3" : os.path.join(media, "base_3.png")}
 
-# Defining vertices positions to plot graph
-pos = [
-    np.array([-0.51696583,  0.93714869]),
-    np.array([-0.56742641,  0.82253354]),
-    np.array([-0.62719935,  0.6729658 ]),
-    np.array([-0.68765874,  0.50267799]),
-    np.array([-0.74382698,  0.32035925]),
-    np.array([-0.7941627 ,  0.13217055]),
-    np.array([-0.83666331, -0.05578246]),
-    np.array([-0.86996528, -0.23595114]),
-    np.array([-0.89094869, -0.39926238]),
-    np.array([-0.89163946, -0.53053518]),
-    np.array([-0.38733367,  0.91693445]),
-    np.array([-0.43712311,  0.80092016]),
-    np.array([-0.49716983,  0.65037759]),
-    np.array([-0.5581313 ,  0.48008344]),
-    np.array([-0.61608378,  0.29792199]),
-    np.array([-0.66749135,  0.10980975]),
-    np.array([-0.71289509, -0.07778028]),
-    np.array([-0.74890233, -0.25729352]),
-    np.array([-0.77561893, -0.41942676]),
-    np.array([-0.79111634, -0.54694834]),
-    np.array([-0.21763917,  0.88636633]),
-    np.array([-0.26705243,  0.77026095]),
-    np.array([-0.32663326,  0.61904439]),
-    np.array([-0.38874385,  0.44821624]),
-    np.array([-0.44925398,  0.26544396]),
-    np.array([-0.503791  ,  0.07726947]),
-    np.array([-0.55185069, -0.1106987 ]),
-    np.array([-0.59258626, -0.28972098]),
-    np.array([-0.6253616 , -0.45151689]),
-    np.array([-0.64908797, -0.57808267]),
-    np.array([-0.0265184 ,  0.84316223]),
-    np.array([-0.07569189,  0.72768255]),
-    np.array([-0.13522642,  0.57630147]),
-    np.array([-0.19846837,  0.4052692 ]),
-    np.array([-0.26184534,  0.22231268]),
-    np.array([-0.31914537,  0.03504394]),
-    np.array([-0.37176953, -0.15155968]),
-    np.array([-0.41760519, -0.33009058]),
-    np.array([-0.45635494, -0.49089175]),
-    np.array([-0.48610726, -0.61664203]),
-    np.array([0.17306041, 0.7870388 ]),
-    np.array([0.12523073, 0.67174665]),
-    np.array([0.06542014, 0.52135366]),
-    np.array([0.00057418, 0.35038808]),
-    np.array([-0.06446017,  0.16881244]),
-    np.array([-0.12665467, -0.01764184]),
-    np.array([-0.18358474, -0.20284045]),
-    np.array([-0.23517585, -0.37993201]),
-    np.array([-0.28008131, -0.5395554 ]),
-    np.array([-0.31520095, -0.66452575]),
-    np.array([0.37367169, 0.71735255]),
-    np.array([0.3261134 , 0.60349739]),
-    np.array([0.26568384, 0.4533447 ]),
-    np.array([0.20029084, 0.28232821]),
-    np.array([0.13188387, 0.10076766]),
-    np.array([ 0.06580071, -0.08512693]),
-    np.array([ 0.00327433, -0.26912593]),
-    np.array([-0.05435863, -0.44475043]),
-    np.array([-0.10542573, -0.60277577]),
-    np.array([-0.14543593, -0.72631346]),
-    np.array([0.56559421, 0.6370167 ]),
-    np.array([0.51816683, 0.52173925]),
-    np.array([0.45742793, 0.37180072]),
-    np.array([0.39078859, 0.20081206]),
-    np.array([0.32068581, 0.01991257]),
-    np.array([ 0.25061104, -0.16499424]),
-    np.array([ 0.18319807, -0.34754591]),
-    np.array([ 0.11983138, -0.52158416]),
-    np.array([ 0.06301685, -0.6776568 ]),
-    np.array([ 0.0186711 , -0.79902472]),
-    np.array([0.73944725, 0.54937204]),
-    np.array([0.69356718, 0.43354057]),
-    np.array([0.63327831, 0.28299777]),
-    np.array([0.56640157, 0.11362039]),
-    np.array([ 0.49475948, -0.06586195]),
-    np.array([ 0.42219951, -0.24879945]),
-    np.array([ 0.3508318 , -0.42919368]),
-    np.array([ 0.28323608, -0.60006218]),
-    np.array([ 0.22174755, -0.75283945]),
-    np.array([ 0.17375926, -0.87138453]),
-    np.array([0.88851998, 0.46293385]),
-    np.array([0.84461033, 0.34637144]),
-    np.array([0.78622939, 0.19742634]),
-    np.array([0.71890696, 0.03077887]),
-    np.array([ 0.64701115, -0.14610216]),
-    np.array([ 0.57298256, -0.32634267]),
-    np.array([ 0.4991802 , -0.50380042]),
-    np.array([ 0.42843525, -0.67146086]),
-    np.array([ 0.36371804, -0.82063715]),
-    np.array([ 0.31246931, -0.93602742]),
-    np.array([1.        , 0.39207751]),
-    np.array([0.95865002, 0.27626818]),
-    np.array([0.90164736, 0.12886004]),
-    np.array([ 0.83495187, -0.03602707]),
-    np.array([ 0.76248999, -0.21032434]),
-    np.array([ 0.68749931, -0.38815742]),
-    np.array([ 0.61223136, -0.5631032 ]),
-    np.array([ 0.53957587, -0.72800535]),
-    np.array([ 0.47280378, -0.87360199]),
-    np.array([ 0.41929671, -0.98512662])
-]
+max_image_size = 128  # images are downscaled to at most this side when decoded, icons are never drawn larger
+
+
+# Function that loads an image as a read-only RGBA array, decoding the file only the first time it is needed
+# With a size the image is resized to size x size pixels, and each size is also computed only once
+@lru_cache(maxsize=None)
+def image(name, size=None):
+    from PIL import Image  # imported here so that importing graphy does not load PIL
+
+    if size is None:
+        with Image.open(files[name]) as file:
+            picture = file.convert("RGBA")
+            picture.thumbnail((max_image_size, max_image_size), Image.LANCZOS)
+    else:
+        picture = Image.fromarray(image(name)).resize((size, size), Image.LANCZOS)
+
+    array = np.asarray(picture)
+    array.flags.writeable = False
+
+    return array
@@ -0,0 +1,131 @@
+import heapq
+import time
+from mip import OptimizationStatus, xsum
+
+
+# Class that generates the path constraints of the military model
+# A unit v can only be disconnected (x[v] = 1) when every path from the headquarters to v has an attacked unit,
+# that is x[v] <= sum(y[u] for u in P) for every such path P, counting both of its ends
+# There are exponentially many of these constraints, so the model starts from a seed of them and the ones
+# violated by the solution at hand are found by shortest paths weighted by y and added as rows: for the
+# fractional solutions of the linear relaxation before the search (tighten) and for the integer solution of
+# each search, which is only accepted when it violates none of them, together with the rows of the compact
+# model along their paths
+# (the lazy constraints of CBC are not used, since its search loses optimal solutions with them)
+class PathCuts:
+    max_cuts = 100  # most violated constraints added at a time
+    tolerance = 1e-6
+
+    def __init__(self, n, tails, heads, source, x, y):
+        self.n = n
+        self.source = source
+        self.x = x
+        self.y = y
+
+        self.adj = [[] for _ in range(n)]
+        for v, w in zip(tails, heads):
+            self.adj[v].append(w)
+            self.adj[w].append(v)
+
+        self.rows = set()  # rows of the compact model in the model, as (u, w) for x[w] - x[u] <= y[u] + y[w]
+        self.rounds = 0
+        self.added = 0
+
+    def seed(self, model):
+        # The edges of a breadth-first tree from the headquarters, with the rows of the compact model in the
+        # direction of the tree, hold a path constraint for every unit and keep the first relaxation bounded
+        x, y = self.x, self.y
+        seen = [False]*self.n
+        seen[self.source] = True
+        queue = [self.source]
+
+        for u in queue:
+            for w in self.adj[u]:
+                if not seen[w]:
+                    seen[w] = True
+                    queue.append(w)
+                    self.add_row(model, u, w)
+
+    def shortest_paths(self, weights):
+        # Dijkstra from the headquarters with the weights on the units (a breadth-first search through the units
+        # that are not attacked when the solution is integer), both ends of a path counted
+        dist = [None]*self.n
+        parent = [None]*self.n
+        best = [float("inf")]*self.n
+        best[self.source] = weights[self.source]
+        heap = [(best[self.source], self.source)]
+
+        while heap:
+            d, u = heapq.heappop(heap)
+            if dist[u] is not None:
+                continue
+            dist[u] = d
+
+            for w in self.adj[u]:
+                if dist[w] is None and d + weights[w] < best[w]:
+                    best[w] = d + weights[w]
+                    parent[w] = u
+                    heapq.heappush(heap, (best[w], w))
+
+        return dist, parent
+
+    def violated(self, xs, ys):
+        # Paths of the most violated constraints, as lists of units from the unit to the headquarters
+        dist, parent = self.shortest_paths([max(value, 0.0) for value in ys])
+
+        violated = [(xs[v] - dist[v], v) for v in range(self.n)
+                    if dist[v] is not None and xs[v] > dist[v] + self.tolerance]
+        violated.sort(reverse=True)
+
+        paths = []
+        for _, v in violated[:self.max_cuts]:
+            path = [v]
+            while path[-1] != self.source:
+                path.append(parent[path[-1]])
+            paths.append(path)
+
+        return paths
+
+    def tighten(self, model, max_rounds=50, max_seconds=None):
+        # Cutting plane loop over the linear relaxation, whose cuts stay in the model as rows, so that the
+        # searches start from a tighter model
+        x, y = self.x, self.y
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+
+        for _ in range(max_rounds):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if model.optimize(relax=True) != OptimizationStatus.OPTIMAL:
+                break
+
+            if not self.add(model, self.violated([var.x for var in x], [var.x for var in y])):
+                break
+
+    def add(self, model, paths):
+        # Adds the constraints of the paths to the model, telling whether there was any
+        x, y = self.x, self.y
+
+        if paths:
+            self.rounds += 1
+            for path in paths:
+                model.add_constr(x[path[0]] <= xsum(y[u] for u in path))
+
+                # The rows of the compact model along the path, in both directions, so that the model grows
+                # towards the compact one around the units that the searches try to disconnect
+                for u, w in zip(path, path[1:]):
+                    self.add_row(model, u, w)
+                    self.add_row(model, w, u)
+            self.added += len(paths)
+
+        return bool(paths)
+
+    def add_row(self, model, u, w):
+        if (u, w) not in self.rows:
+            self.rows.add((u, w))
+            model.add_constr(self.x[w] - self.x[u] <= self.y[u] + self.y[w])
+
+    def separated(self, ys):
+        # Units that an integer attack ys disconnects from the headquarters (the attacked ones included)
+        dist, _ = self.shortest_paths([max(value, 0.0) for value in ys])
+
+        return [d is None or d >= 0.5 for d in dist]
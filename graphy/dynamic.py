@@ -0,0 +1,177 @@
+import numpy as np
+from .cache import Solution
+from .reduction import knapsack_merge, reached_nodes
+
+
+# Class that solves the military distribution problem exactly with a dynamic program over the block-cut tree
+# The tree is rooted at the headquarters, each block hangs from the unit through which it is entered, and
+# a table[b] holds the most units disconnected below a unit or a block with a budget of at most b
+# Inside a block every affordable attack of its units is enumerated, so the work grows with 2**width, where
+# width is the largest number of attackable units of a block other than its entry (1 for trees)
+class BlockTreeDP:
+    def __init__(self, network, fire_power=6):
+        import networkx as nx  # only needed to find the blocks
+
+        self.network = network
+        self.fire_power = fire_power
+
+        headquarters = network.find("headquarters")
+        self.headquarters = headquarters
+
+        # Units cut off from the headquarters are always disconnected, the others form one connected graph
+        supplied = reached_nodes(network, headquarters)
+        alive = network.edge_alive & supplied[network.tails] & supplied[network.heads]
+
+        G = nx.Graph()
+        G.add_node(headquarters)
+        G.add_edges_from(zip(network.tails[alive].tolist(), network.heads[alive].tolist()))
+
+        self.endurance = network.endurance.tolist()
+        self.adj = {v : set(G[v]) for v in G}
+
+        # Rooting the block-cut tree at the headquarters, with blocks listed parents first
+        blocks_of = {}
+        for block in nx.biconnected_components(G):
+            for v in block:
+                blocks_of.setdefault(v, []).append(block)
+
+        self.blocks = []  # (entry, other units of the block)
+        self.child_blocks = {}  # indices of the blocks hanging from each unit
+        seen = set()
+
+        stack = [headquarters]
+        while stack:
+            v = stack.pop()
+            self.child_blocks[v] = []
+
+            for block in blocks_of.get(v, []):
+                key = frozenset(block)
+                if key in seen:
+                    continue
+
+                seen.add(key)
+                units = sorted(block - {v})
+                self.child_blocks[v].append(len(self.blocks))
+                self.blocks.append((v, units))
+                stack.extend(units)
+
+        self.width = max((sum(self.endurance[u] <= fire_power for u in units) for _, units in self.blocks),
+                         default=0)
+
+        # Tables filled by the first solve
+        self.unit_table = None
+        self.unit_splits = None
+        self.block_table = None
+        self.block_choice = None
+
+    def solve(self, budget=None):
+        # Any budget up to fire_power can be answered from the same tables
+        if self.unit_table is None:
+            self.fill_tables()
+
+        B = self.fire_power
+        endurance = self.endurance
+        unit_table, unit_splits = self.unit_table, self.unit_splits
+
+        # Units of the attack, recovered from the choices stored for the budget
+        attack = []
+        stack = [("unit", self.headquarters, B if budget is None else budget)]
+        while stack:
+            kind, item, budget = stack.pop()
+
+            if kind == "unit":
+                for i, split in zip(reversed(self.child_blocks[item]), reversed(unit_splits[item])):
+                    spent = int(split[budget])
+                    stack.append(("block", i, spent))
+                    budget -= spent
+            else:
+                chosen, connected = self.block_choice[item][budget]
+                attack += chosen
+
+                budget -= sum(endurance[u] for u in chosen)
+                _, splits = knapsack_merge([unit_table[u] for u in connected], B)
+                for u, split in zip(reversed(connected), reversed(splits)):
+                    spent = int(split[budget])
+                    stack.append(("unit", u, spent))
+                    budget -= spent
+
+        network = self.network
+        reached = reached_nodes(network, self.headquarters, removed_nodes=attack)
+        disconnected = np.flatnonzero(network.node_alive & ~reached).tolist()
+
+        return Solution(float(len(disconnected)), disconnected, sorted(attack))
+
+    def fill_tables(self):
+        below = {}  # units hanging below each unit
+        unit_table = {}  # best values below each unit while it is supplied
+        unit_splits = {}
+        self.block_table = {}
+        self.block_choice = {}  # best attack inside the block for each budget, as (attack, connected units)
+
+        # Children before parents: a block is only processed after the blocks hanging from its units
+        for i in reversed(range(len(self.blocks))):
+            entry, units = self.blocks[i]
+
+            for u in units:
+                if u not in unit_table:
+                    self.close_unit(u, below, unit_table, unit_splits)
+
+            self.block_table[i], self.block_choice[i] = self.enumerate_block(entry, units, below, unit_table)
+
+        self.close_unit(self.headquarters, below, unit_table, unit_splits)
+
+        self.unit_table = unit_table
+        self.unit_splits = unit_splits
+
+    def close_unit(self, v, below, unit_table, unit_splits):
+        blocks = self.child_blocks.get(v, [])
+
+        below[v] = sum(len(self.blocks[i][1]) + sum(below[u] for u in self.blocks[i][1]) for i in blocks)
+        unit_table[v], unit_splits[v] = knapsack_merge([self.block_table[i] for i in blocks], self.fire_power)
+
+    def enumerate_block(self, entry, units, below, unit_table):
+        B = self.fire_power
+        endurance = self.endurance
+
+        # Units of the block as bits, with the neighbors of each unit inside the block as bit masks
+        bit = {u : 1 << k for k, u in enumerate(units)}
+        neighbors = [sum(bit[w] for w in self.adj[u] if w in bit) for u in units]
+        start = sum(bit[w] for w in self.adj[entry] if w in bit)
+        attackable = [k for k, u in enumerate(units) if endurance[u] <= B]
+
+        choice = [None]*(B + 1)
+        best = np.full(B + 1, -1, dtype=np.int64)
+
+        for mask in range(1 << len(attackable)):
+            chosen = [attackable[k] for k in range(len(attackable)) if mask >> k & 1]
+            cost = sum(endurance[units[k]] for k in chosen)
+            if cost > B:
+                continue
+
+            removed = sum(1 << k for k in chosen)
+
+            # Units still connected to the entry of the block
+            reached = start & ~removed
+            frontier = reached
+            while frontier:
+                grown = 0
+                for k in range(len(units)):
+                    if frontier >> k & 1:
+                        grown |= neighbors[k]
+
+                frontier = grown & ~removed & ~reached
+                reached |= frontier
+
+            lost = sum(1 + below[u] for k, u in enumerate(units) if not reached >> k & 1)
+            connected = [u for k, u in enumerate(units) if reached >> k & 1 and unit_table[u].any()]
+            merged, _ = knapsack_merge([unit_table[u] for u in connected], B)
+
+            values = np.full(B + 1, -1, dtype=np.int64)
+            values[cost:] = lost + merged[:B + 1 - cost]
+
+            better = np.flatnonzero(values > best)
+            for b in better.tolist():
+                choice[b] = ([units[k] for k in chosen], connected)
+            best = np.maximum(best, values)
+
+        return best, choice
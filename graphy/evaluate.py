@@ -0,0 +1,124 @@
+import numpy as np
+from .components import reachable
+from .network import as_grid
+
+
+# Class that scores many candidate cuts of one network at once without changing the network
+# Candidates are lists of edges (v, w) for water networks and lists of nodes for military networks
+# Each chunk of candidates is checked by one breadth-first search run over as many copies of the network
+class CutEvaluator:
+    def __init__(self, network, fire_power=6, optimum=None, chunk_size=1024):
+        self.network = network = as_grid(network)
+        self.fire_power = fire_power
+        self.optimum = optimum
+        self.chunk_size = chunk_size
+
+        source = "origin" if network.kind == "water" else "headquarters"
+        self.source = network.find(source)
+        self.dest = network.find("dest")
+
+        # Sorted keys of the edges, so that the edges of the candidates are found with a binary search
+        low = np.minimum(network.tails, network.heads).astype(np.int64)
+        high = np.maximum(network.tails, network.heads).astype(np.int64)
+        keys = low*network.n + high
+
+        self.order = np.argsort(keys)
+        self.keys = keys[self.order]
+
+    def edge_ids(self, edges):
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        keys = edges.min(axis=1)*self.network.n + edges.max(axis=1)
+
+        positions = np.clip(np.searchsorted(self.keys, keys), 0, len(self.keys) - 1)
+        ids = self.order[positions]
+
+        missing = (self.keys[positions] != keys) | ~self.network.edge_alive[ids]
+        if missing.any():
+            raise KeyError(tuple(edges[np.argmax(missing)].tolist()))
+
+        return ids
+
+    def removed(self, candidates):
+        # Flattening the candidates into the copy each item belongs to and the item itself
+        counts = np.array([len(c) for c in candidates], dtype=np.int64)
+        copy = np.repeat(np.arange(len(candidates)), counts)
+        items = [item for candidate in candidates for item in candidate]
+
+        if self.network.kind == "water":
+            return copy, self.edge_ids(items) if items else np.zeros(0, dtype=np.int64)
+
+        return copy, np.asarray(items, dtype=np.int64)
+
+    def reached(self, candidates):
+        # Nodes still connected to the origin (or the headquarters) after each candidate, as a (K, n) array
+        network = self.network
+        copy, items = self.removed(candidates)
+
+        if network.kind == "water":
+            keep = np.tile(network.edge_alive, (len(candidates), 1))
+            keep[copy, items] = False
+        else:
+            alive = np.tile(network.node_alive, (len(candidates), 1))
+            alive[copy, items] = False
+            keep = network.edge_alive & alive[:, network.tails] & alive[:, network.heads]
+
+        reached = reachable(network.indptr, network.indices, network.edge_ids, self.source, keep)
+
+        if network.kind == "military":
+            reached[copy[items == self.source], self.source] = False  # attacking the headquarters itself
+
+        return reached
+
+    def evaluate(self, candidates):
+        # Columns for each candidate: feasible, disconnected (units cut off from the source, not counting the
+        # removed ones), value (objective value of the candidate) and gap (distance to the optimum, nan when
+        # infeasible or when the optimum is not known)
+        candidates = [list(c) for c in candidates]
+        columns = {"feasible" : [], "disconnected" : [], "value" : [], "gap" : []}
+
+        for start in range(0, len(candidates), self.chunk_size):
+            for name, values in self.evaluate_chunk(candidates[start:start + self.chunk_size]).items():
+                columns[name].append(values)
+
+        return {name : np.concatenate(values) if values else np.zeros(0) for name, values in columns.items()}
+
+    def evaluate_chunk(self, candidates):
+        network = self.network
+        K = len(candidates)
+
+        reached = self.reached(candidates)
+        lost = network.node_alive & ~reached
+        copy, items = self.removed(candidates)
+
+        if network.kind == "water":
+            # Removing a red pipe is not allowed and the destination must lose its supply
+            red = np.bincount(copy, weights=network.red[items], minlength=K) > 0
+            feasible = ~red & ~reached[:, self.dest]
+
+            value = np.bincount(np.unique(copy*len(network.red) + items) // len(network.red), minlength=K)
+            value = value.astype(float)  # pipes given twice (in any orientation) are counted once
+            disconnected = lost.sum(axis=1)
+            gap = value - self.optimum if self.optimum is not None else np.full(K, np.nan)
+        else:
+            # The attack must fit in the firepower and counts the attacked units as disconnected
+            cost = np.zeros(K, dtype=np.int64)
+            attacked = np.zeros((K, network.n), dtype=bool)
+            attacked[copy, items] = True
+            np.add.at(cost, copy, network.endurance[items])
+
+            feasible = (cost <= self.fire_power) & ~attacked[:, self.source]
+
+            value = lost.sum(axis=1).astype(float)
+            disconnected = (lost & ~attacked).sum(axis=1)
+            gap = self.optimum - value if self.optimum is not None else np.full(K, np.nan)
+
+        return {"feasible" : feasible,
+                "disconnected" : disconnected,
+                "value" : value,
+                "gap" : np.where(feasible, gap, np.nan)}
+
+    def disconnected_nodes(self, candidate):
+        # Nodes cut off from the source by a single candidate (removed nodes included for military networks)
+        lost = self.network.node_alive & ~self.reached([list(candidate)])[0]
+
+        return np.flatnonzero(lost).tolist()
@@ -0,0 +1,417 @@
+import numpy as np
+from .network import as_grid
+
+
+# Class that computes maximum flows with Dinic's algorithm over a CSR residual network
+# Edges are undirected unless reverse_capacities gives the capacities from head to tail
+class MaxFlow:
+    def __init__(self, n, tails, heads, capacities, reverse_capacities=None):
+        self.n = n  # number of nodes
+        self.m = len(tails)  # number of undirected edges
+
+        tails = np.asarray(tails, dtype=np.int32)
+        heads = np.asarray(heads, dtype=np.int32)
+        capacities = np.asarray(capacities, dtype=np.int64)
+        reverse_capacities = capacities if reverse_capacities is None else \
+                             np.asarray(reverse_capacities, dtype=np.int64)
+
+        # Each undirected edge i becomes the arcs 2i (tail -> head) and 2i+1 (head -> tail)
+        # The reverse of an arc is therefore obtained by flipping its lowest bit
+        arc_tail = np.empty(2*self.m, dtype=np.int32)
+        arc_head = np.empty(2*self.m, dtype=np.int32)
+        arc_tail[0::2], arc_tail[1::2] = tails, heads
+        arc_head[0::2], arc_head[1::2] = heads, tails
+
+        arc_capacity = np.empty(2*self.m, dtype=np.int64)
+        arc_capacity[0::2], arc_capacity[1::2] = capacities, reverse_capacities
+
+        # Compressed sparse row view: arcs leaving v are arcs[indptr[v]:indptr[v+1]]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(arc_tail, minlength=n), out=indptr[1:])
+
+        # Python lists are much faster than arrays for the scalar accesses of the search
+        self.indptr = indptr.tolist()
+        self.arcs = np.argsort(arc_tail, kind="stable").tolist()
+        self.head = arc_head.tolist()
+        self.capacity = arc_capacity.tolist()
+        self.residual = self.capacity.copy()
+
+        self.value = 0
+        self.level = None
+
+    def max_flow(self, s, t):
+        # Resetting the residual network so that the object can be reused for other pairs
+        self.residual = self.capacity.copy()
+        self.value = 0
+
+        return self.augment(s, t)
+
+    def augment(self, s, t):
+        # Augmenting the current flow until it is maximum (a flow repaired after a change only needs this part)
+        while self._bfs(s, t):
+            it = self.indptr[:-1]  # current arc of each node (dead arcs are skipped only once)
+
+            while True:
+                f = self._augment(s, t, it)
+                if not f:
+                    break
+                self.value += f
+
+        return self.value
+
+    def _bfs(self, s, t):
+        indptr, arcs, head, residual = self.indptr, self.arcs, self.head, self.residual
+
+        self.level = level = [-1]*self.n
+        level[s] = 0
+
+        queue = [s]
+        for v in queue:
+            for i in range(indptr[v], indptr[v+1]):
+                a = arcs[i]
+                w = head[a]
+                if residual[a] > 0 and level[w] < 0:
+                    level[w] = level[v] + 1
+                    queue.append(w)
+
+        return level[t] >= 0  # True if the sink is still reachable in the residual network
+
+    def _augment(self, s, t, it):
+        indptr, arcs, head, residual, level = self.indptr, self.arcs, self.head, self.residual, self.level
+
+        # Iterative depth-first search in the level graph
+        path = []
+        v = s
+        while v != t:
+            while it[v] < indptr[v+1]:
+                a = arcs[it[v]]
+                w = head[a]
+                if residual[a] > 0 and level[w] == level[v] + 1:
+                    break
+                it[v] += 1
+            else:
+                # Dead end: removing v from the level graph and backtracking
+                level[v] = -1
+                if not path:
+                    return 0
+
+                a = path.pop()
+                v = head[a ^ 1]
+                it[v] += 1
+
+                continue
+
+            path.append(a)
+            v = w
+
+        # Pushing the bottleneck along the path found
+        f = min(residual[a] for a in path)
+        for a in path:
+            residual[a] -= f
+            residual[a ^ 1] += f
+
+        return f
+
+    def source_side(self, s):
+        indptr, arcs, head, residual = self.indptr, self.arcs, self.head, self.residual
+
+        # Nodes reachable from s in the residual network form the source side of a minimum cut
+        reached = [False]*self.n
+        reached[s] = True
+
+        queue = [s]
+        for v in queue:
+            for i in range(indptr[v], indptr[v+1]):
+                a = arcs[i]
+                w = head[a]
+                if residual[a] > 0 and not reached[w]:
+                    reached[w] = True
+                    queue.append(w)
+
+        return reached
+
+    def cut_edges(self, s):
+        reached = self.source_side(s)
+        head = self.head
+
+        return [i for i in range(self.m) if reached[head[2*i]] != reached[head[2*i + 1]]]
+
+
+# Class that keeps the maximum flow of a water distribution network and the nodes supplied by the origin while
+# pipes are removed, so that what-if removals are answered without solving the network again
+# A removed pipe only sends back the flow it carried: the flow is rerouted around it when possible, otherwise
+# it is returned to the origin, and the supplied nodes only change when the pipe was the last link of a part
+class DynamicCut:
+    def __init__(self, network):
+        network = as_grid(network)
+
+        self.origin = network.find("origin")
+        self.dest = network.find("dest")
+
+        alive = network.edge_alive
+        self.edges = network.edge_list()
+        self.index = {}  # edge i of both orientations of each pipe
+        for i, (v, w) in enumerate(self.edges):
+            self.index[v, w] = self.index[w, v] = i
+
+        # Each pipe has unit capacity and red pipes can never be cut (capacity greater than any cut)
+        self.infinity = len(self.edges) + 1
+        capacities = np.where(network.red[alive], self.infinity, 1)
+
+        self.flow = MaxFlow(network.n, network.tails[alive], network.heads[alive], capacities)
+        self.flow.max_flow(self.origin, self.dest)
+
+        self.nodes = network.nodes.tolist()
+        self.supplied = [False]*network.n
+        for v in self.search([self.origin])[0]:
+            self.supplied[v] = True
+
+    @property
+    def value(self):
+        return float(self.flow.value)
+
+    @property
+    def disconnected_nodes(self):
+        return [v for v in self.nodes if not self.supplied[v]]
+
+    def min_cut(self):
+        # Pipes of a minimum cut of the pipes still in the network
+        capacity = self.flow.capacity
+        return [self.edges[i] for i in self.flow.cut_edges(self.origin) if capacity[2*i]]
+
+    def remove_edges_from(self, edges):
+        for v, w in edges:
+            self.remove_edge(v, w)
+
+    def remove_edge(self, v, w):
+        flow = self.flow
+        i = self.index[v, w]
+        a = 2*i
+
+        if not flow.capacity[a]:
+            raise KeyError((v, w))
+
+        # Net flow from the tail to the head of the pipe, which loses both of its arcs
+        carried = flow.capacity[a] - flow.residual[a]
+        flow.capacity[a] = flow.capacity[a ^ 1] = 0
+        flow.residual[a] = flow.residual[a ^ 1] = 0
+
+        if carried:
+            tail, head = flow.head[a ^ 1], flow.head[a]
+            self.repair(*((tail, head) if carried > 0 else (head, tail)), abs(carried))
+
+        self.disconnect(v, w)
+
+    def repair(self, u, v, f):
+        # The flow f that went from u to v is rerouted, and what can not be is sent back from u to the origin
+        # and taken from the destination to v, which lowers the flow by that amount
+        f -= self.push(u, v, f)
+        if not f:
+            return
+
+        self.push(u, self.origin, f)
+        self.push(self.dest, v, f)
+        self.flow.value -= f
+
+        # Paths freed by the returned flow may still reach the destination
+        self.flow.augment(self.origin, self.dest)
+
+    def push(self, s, t, limit):
+        # Pushes up to limit units from s to t along paths of the residual network
+        flow = self.flow
+        indptr, arcs, head, residual = flow.indptr, flow.arcs, flow.head, flow.residual
+        pushed = 0
+
+        while pushed < limit and s != t:
+            parent = {s : None}
+            queue = [s]
+
+            for x in queue:
+                for k in range(indptr[x], indptr[x+1]):
+                    a = arcs[k]
+                    y = head[a]
+                    if residual[a] > 0 and y not in parent:
+                        parent[y] = a
+                        queue.append(y)
+                if t in parent:
+                    break
+
+            if t not in parent:
+                break
+
+            path = []
+            y = t
+            while parent[y] is not None:
+                path.append(parent[y])
+                y = head[parent[y] ^ 1]
+
+            f = min([limit - pushed] + [residual[a] for a in path])
+            for a in path:
+                residual[a] -= f
+                residual[a ^ 1] += f
+            pushed += f
+
+        return limit if s == t else pushed
+
+    def search(self, starts):
+        # Breadth-first searches through the pipes still in the network from every start in turn, one node
+        # at a time, until a search ends (the part it explored is returned with its index) or one of them
+        # reaches a node of another (None is returned)
+        flow = self.flow
+        indptr, arcs, head, capacity = flow.indptr, flow.arcs, flow.head, flow.capacity
+
+        owner = {v : k for k, v in enumerate(starts)}
+        queues = [[v] for v in starts]
+        positions = [0]*len(starts)
+
+        while True:
+            for k, queue in enumerate(queues):
+                if positions[k] == len(queue):
+                    return queue, k
+
+                x = queue[positions[k]]
+                positions[k] += 1
+
+                for j in range(indptr[x], indptr[x+1]):
+                    a = arcs[j]
+                    if not capacity[a]:
+                        continue
+
+                    y = head[a]
+                    if y not in owner:
+                        owner[y] = k
+                        queue.append(y)
+                    elif owner[y] != k:
+                        return None
+
+    def disconnect(self, v, w):
+        # The searches from both ends stop as soon as they meet, or when the smaller part runs out of nodes
+        if not self.supplied[v]:
+            return
+
+        found = self.search([v, w])
+        if found is None:
+            return
+
+        part = set(found[0])
+        if self.origin in part:
+            lost = [x for x in self.nodes if self.supplied[x] and x not in part]
+        else:
+            lost = part
+
+        for x in lost:
+            self.supplied[x] = False
+
+# Class that builds a Gomory-Hu tree of a water distribution network with Gusfield's algorithm
+# The n-1 maximum flows give a tree where the smallest weight on the path between two nodes is their minimum
+# cut, and the tree edge with that weight splits the nodes into the two sides of the cut
+# Red pipes can never be removed, so pairs that only a red pipe could separate have an infinite cut
+class GomoryHuTree:
+    def __init__(self, network):
+        self.network = network = as_grid(network)
+
+        alive = network.edge_alive
+        self.edges = network.edge_list()
+        self.infinity = len(self.edges) + 1  # larger than any cut made only of removable pipes
+
+        capacities = np.where(network.red[alive], self.infinity, 1)
+        flow = MaxFlow(network.n, network.tails[alive], network.heads[alive], capacities)
+
+        nodes = network.nodes.tolist()
+        self.nodes = nodes
+        self.root = root = nodes[0]
+
+        # Every node starts hanging from the root, and each flow moves the nodes on its side of the cut
+        parent = {v : root for v in nodes}
+        weight = {v : 0 for v in nodes}
+        parent[root] = None
+
+        for s in nodes[1:]:
+            t = parent[s]
+            value = flow.max_flow(s, t)
+            side = flow.source_side(s)
+            weight[s] = value
+
+            for v in nodes:
+                if v != s and side[v] and parent[v] == t:
+                    parent[v] = s
+
+            if parent[t] is not None and side[parent[t]]:
+                parent[s], parent[t] = parent[t], s
+                weight[s], weight[t] = weight[t], value
+
+        self.parent = parent
+        self.weight = weight
+
+        # Depth of each node in the tree, for the path queries
+        children = {}
+        for v in nodes:
+            if parent[v] is not None:
+                children.setdefault(parent[v], []).append(v)
+
+        self.depth = {root : 0}
+        self.order = [root]  # parents before children
+        for v in self.order:
+            for w in children.get(v, []):
+                self.depth[w] = self.depth[v] + 1
+                self.order.append(w)
+
+    def lightest_edge(self, u, v):
+        # Tree edge with the smallest weight on the path between u and v, given by its lower node
+        if u == v:
+            raise ValueError("a node can not be separated from itself")
+
+        parent, weight, depth = self.parent, self.weight, self.depth
+        lightest = None
+
+        while u != v:
+            if depth[u] < depth[v]:
+                u, v = v, u
+
+            if lightest is None or weight[u] < weight[lightest]:
+                lightest = u
+            u = parent[u]
+
+        return lightest
+
+    def min_cut_value(self, u, v):
+        value = self.weight[self.lightest_edge(u, v)]
+        return float("inf") if value >= self.infinity else float(value)
+
+    def min_cut(self, u, v):
+        # Value of the minimum cut between u and v with the pipes (v, w) to remove
+        lightest = self.lightest_edge(u, v)
+        if self.weight[lightest] >= self.infinity:
+            raise ValueError(f"{u} and {v} are joined by red pipes, so they can not be disconnected")
+
+        # Removing the lightest edge from the tree leaves the subtree below it on one side of the cut
+        below = set([lightest])
+        for w in self.order[self.order.index(lightest) + 1:]:
+            if self.parent[w] in below:
+                below.add(w)
+
+        return float(self.weight[lightest]), [(a, b) for a, b in self.edges if (a in below) != (b in below)]
+
+    def matrix(self):
+        # Minimum cut of every pair of cells as an (n, n) array (inf for inseparable pairs and the diagonal,
+        # 0 for cells without a node)
+        n = self.network.n
+        order = np.array(self.order)
+        parent = np.array([-1 if self.parent[v] is None else self.parent[v] for v in self.order])
+        weight = np.array([self.weight[v] for v in self.order], dtype=float)
+        weight[weight >= self.infinity] = np.inf
+
+        cuts = np.zeros((n, n))
+        cuts[order, order] = np.inf
+
+        # Going down the tree from every node at once: the cut to a child is the smallest of the cut to its
+        # parent and the weight of the edge between them, in both directions of the path
+        for k in range(1, len(order)):
+            v, p = order[k], parent[k]
+            above = order[:k]
+
+            cuts[above, v] = np.minimum(cuts[above, p], weight[k])
+            cuts[v, above] = cuts[above, v]
+            cuts[v, v] = np.inf
+
+        return cuts
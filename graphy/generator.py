@@ -1,6 +1,6 @@
 import numpy as np
-import networkx as nx
-from .constants import images
+from .components import spanning_forest
+from .network import GridNetwork
 
 
 # Class that will help create a connected graph
@@ -28,77 +28,140 @@ class UnionFind:
             return True  # union was not performed
 
 # Class that defines the graph generator
+# The seed can be anything accepted by np.random.default_rng (an int, a SeedSequence or a Generator)
 class GraphGenerator:
-    def __init__(self, N=100):
+    def __init__(self, N=100, seed=None):
         self.N = N  # number os cells (default is a 10x10 grid)
         self.shape = int(self.N**0.5)
+        self.grid_shape = (-(-self.N // self.shape), self.shape)  # rows and columns of the grid
+
+        self.rng = np.random.default_rng(seed)
 
         self.edges = self.generate_edges()
 
-    def water_network(self):        
-        # Copy the edges and create a disjoint set for each cell
-        edges = self.edges.copy()
-        forest = UnionFind(self.N)
+    def connected_edges(self, size=None):
+        # Drawing edges at random until the grid is connected is the same as taking the shortest
+        # prefix of a random permutation that connects it, which ends at the last edge of the
+        # minimum spanning tree when the weights are the positions in the permutation
+        K = 1 if size is None else size
+        E = len(self.edges)
+
+        perms = self.rng.permuted(np.tile(np.arange(E), (K, 1)), axis=1)
+
+        # The K grids are solved at once as the disjoint union of their copies
+        ends = self.edges[perms] + (self.N*np.arange(K))[:, None, None]
+        forest = spanning_forest(K*self.N, ends[..., 0].ravel(), ends[..., 1].ravel()).reshape(K, E)
+        lengths = E - np.argmax(forest[:, ::-1], axis=1) if E else np.zeros(K, dtype=int)
+
+        batch = [self.edges[perm[:k]] for perm, k in zip(perms, lengths)]
+
+        return batch[0] if size is None else batch
+
+    def water_arrays(self, size=None):
+        K = 1 if size is None else size
+        step = 2*self.shape + 2
+
+        # Destination drawn uniformly among the cells far enough from the origin
+        origin = self.rng.integers(0, self.N, K)
+        below = np.clip(origin - step, 0, None)
+        above = np.clip(self.N - 1 - (origin + step), 0, None)
+        r = self.rng.integers(0, below + above)
+        dest = np.where(r < below, r, origin + step + 1 + (r - below))
+
+        # Edges with endpoint at origin or dest are marked as red (constraint that prevents the deletion of an edge)
+        batch = [{"shape" : self.grid_shape,
+                  "edges" : edges,
+                  "red" : ((edges == o) | (edges == d)).any(axis=1),
+                  "origin" : int(o),
+                  "dest" : int(d)}
+                 for edges, o, d in zip(self.connected_edges(K), origin, dest)]
+
+        return batch[0] if size is None else batch
+
+    def military_arrays(self, size=None):
+        K = 1 if size is None else size
+
+        endurances = self.rng.choice(np.arange(1, 4), (K, self.N), [0.2, 0.2, 0.6]).astype(np.int32)
+        headquarters = self.rng.integers(0, self.N, K)
+
+        batch = []
+        for edges, endurance, h in zip(self.connected_edges(K), endurances, headquarters):
+            # The headquarters is the most difficult enemy military installation to attack
+            # and the military installations adjacent to it are harder to attack
+            endurance[edges[(edges == h).any(axis=1)]] = 100
+            endurance[h] = 10000
+
+            batch.append({"shape" : self.grid_shape,
+                          "edges" : edges,
+                          "endurance" : endurance,
+                          "headquarters" : int(h)})
+
+        return batch[0] if size is None else batch
+
+    def water_grid(self, size=None):
+        return self.seeded(self.water_arrays, size)
+
+    def military_grid(self, size=None):
+        return self.seeded(self.military_arrays, size)
+
+    def seeded(self, draw, size=None):
+        # Each network is drawn from its own integer seed, recorded in it, so that
+        # GridNetwork.from_arrays(GraphGenerator(N, network.seed).water_arrays()) draws it again
+        seeds = self.rng.integers(0, 2**63, 1 if size is None else size).tolist()
+        rng = self.rng
+
+        batch = []
+        try:
+            for seed in seeds:
+                self.rng = np.random.default_rng(seed)
+                batch.append(GridNetwork.from_arrays(draw(), seed=seed))
+        finally:
+            self.rng = rng
+
+        return batch[0] if size is None else batch
+
+    def water_network(self):
+        import networkx as nx  # only needed by the networkx views, so worker processes do not load it
+
+        network = self.water_arrays()
+        origin, dest = network["origin"], network["dest"]
         
         # Generate a graph
-        G = nx.Graph()
+        G = nx.Graph(shape=self.grid_shape)
         
         # Adding nodes
         # Value of flow is True because, initially, it is a connected graph
-        for v in range(self.N):
-            G.add_node(v, node_prop=None, flow=True, image=images["node_water"])
-        
-        step = 2*self.shape + 2
-        
-        origin = np.random.randint(0, self.N)
-        dest = np.random.choice([v for v in range(self.N) if v < origin-step or v > origin+step])
+        G.add_nodes_from(range(self.N), node_prop=None, flow=True)
     
         G.nodes[origin]["node_prop"] = "origin"
-        G.nodes[origin]["image"] = images["origin"]
         G.nodes[dest]["node_prop"] = "dest"
-        G.nodes[dest]["image"] = images["dest"]
         
         # Adding edges
-        # Makes sure that the initial graph will be connected
-        # Edges with endpoint at origin or dest are marked as red (constraint that prevents the deletion of an edge)
-        while forest.n > 1:
-            v, w = edges.pop(np.random.randint(0, len(edges)))
-            forest.union(v, w)
-            G.add_edge(v, w, color="red" if G.nodes[v]["node_prop"] or G.nodes[w]["node_prop"] else "blue")
+        G.add_edges_from((v, w, {"color" : "red" if red else "blue"})
+                         for (v, w), red in zip(network["edges"].tolist(), network["red"].tolist()))
                 
         return G
     
-    def military_network(self):        
-        # Copy the edges and create a disjoint set for each cell
-        edges = self.edges.copy()
-        forest = UnionFind(self.N)
+    def military_network(self):
+        import networkx as nx
+
+        network = self.military_arrays()
+        h = network["headquarters"]
         
         # Generate a graph
-        G = nx.Graph()
+        G = nx.Graph(shape=self.grid_shape)
         
         # Adding nodes
-        endurances = np.random.choice(np.arange(1, 4), self.N, [0.2, 0.2, 0.6])
-        for v, e in enumerate(endurances):
-            G.add_node(v, node_prop=None, endurance=e, provided=True, image=images[f"base_{e}"])
+        for v, e in enumerate(network["endurance"].tolist()):
+            G.add_node(v, node_prop=None, endurance=e, provided=True)
 
         # Adding edges
-        # Makes sure that the initial graph will be connected
-        while forest.n > 1:
-            v, w = edges.pop(np.random.randint(0, len(edges)))
-            forest.union(v, w)
-            G.add_edge(v, w)
-
-        # The headquarters is the most difficult enemy military installation to attack
-        h = np.random.randint(0, self.N)
-    
+        G.add_edges_from(network["edges"].tolist())
+
         G.nodes[h]["node_prop"] = "headquarters"
-        G.nodes[h]["endurance"] = 10000
-        G.nodes[h]["image"] = images["headquarters"]
 
-        # Harder to attack military installations adjacent to headquarters
         for v in G[h]:
             G.nodes[v]["node_prop"] = "secure"
-            G.nodes[v]["endurance"] = 100
                 
         return G
                 
@@ -114,9 +177,12 @@ class GraphGenerator:
         return available_edges  # possible edges in cell v
 
     def generate_edges(self):
-        edges = []
-        
-        for v in range(self.N):
-            edges.extend(self.available_edges(v))
+        v = np.arange(self.N, dtype=np.int32)
 
-        return edges
+        # Right and down neighbors of every cell, in the same order as available_edges
+        right = np.stack([v, v + 1], axis=1)[(v+1) % self.shape != 0]
+        down = np.stack([v, v + self.shape], axis=1)[v + self.shape < self.N]
+
+        edges = np.concatenate([right, down])
+        
+        return edges[np.lexsort((edges[:, 1], edges[:, 0]))]  # possible edges of the grid
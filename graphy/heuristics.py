@@ -0,0 +1,234 @@
+import time
+from .flow import MaxFlow
+from .network import GridNetwork
+
+
+# Function that tells whether a deadline of time.perf_counter (None for no deadline) has passed
+def expired(deadline):
+    return deadline is not None and time.perf_counter() > deadline
+
+# Class that quickly builds good feasible attacks on a military distribution network
+# The attacks are used as MIP starts by the solver but also work as an anytime answer by themselves
+class MilitaryHeuristic:
+    def __init__(self, network, fire_power=6):
+        if isinstance(network, GridNetwork):
+            network = network.to_networkx()
+
+        self.network = network
+        self.fire_power = fire_power
+
+        self.adj = {v : list(network[v]) for v in network}
+        self.endurance = dict(network.nodes.data("endurance"))
+
+        for v, prop in network.nodes.data("node_prop"):
+            if prop == "headquarters":
+                self.headquarters = v
+
+        # Only military units that fit in the firepower budget can be attacked
+        self.candidates = [v for v, e in self.endurance.items()
+                           if e <= fire_power and v != self.headquarters]
+        self.attackable = set(self.candidates)
+
+    def cost(self, attack):
+        return sum(self.endurance[v] for v in attack)
+
+    def supplied(self, attack):
+        removed = set(attack)
+
+        # Breadth-first search from the headquarters avoiding the removed units
+        reached = {self.headquarters}
+        queue = [self.headquarters]
+        for v in queue:
+            for w in self.adj[v]:
+                if w not in reached and w not in removed:
+                    reached.add(w)
+                    queue.append(w)
+
+        return reached
+
+    def value(self, attack):
+        # Number of military units disconnected from the headquarters (the removed ones included)
+        return len(self.adj) - len(self.supplied(attack))
+
+    def disconnected_nodes(self, attack):
+        supplied = self.supplied(attack)
+
+        return [v for v in self.adj if v not in supplied]
+
+    def layers(self):
+        # Breadth-first layers around the headquarters, each one separates everything beyond it
+        layers = []
+        layer = [self.headquarters]
+        seen = {self.headquarters}
+        while layer:
+            layer = [w for v in layer for w in self.adj[v] if w not in seen]
+            seen.update(layer)
+            layer = list(dict.fromkeys(layer))
+
+            if layer:
+                layers.append(layer)
+
+        return [layer for layer in layers if self.cost(layer) <= self.fire_power]
+
+    def separators(self, deadline=None):
+        # Vertex cuts as edge cuts of the split network: unit v becomes the arc in(v) -> out(v)
+        # with capacity equal to its endurance, and anything above the firepower is never cut
+        nodes = list(self.adj)
+        index = {v : i for i, v in enumerate(nodes)}
+        n = len(nodes)
+        infinity = self.fire_power + 1
+
+        tails = list(range(n))
+        heads = list(range(n, 2*n))
+        capacities = [self.endurance[v] if v in self.attackable else infinity for v in nodes]
+
+        for v, w in self.network.edges:
+            tails += [n + index[v], n + index[w]]
+            heads += [index[w], index[v]]
+            capacities += [infinity, infinity]
+
+        flow = MaxFlow(2*n, tails, heads, capacities, [0]*len(capacities))
+
+        # Targets in breadth-first order from the headquarters, so that a deadline stops the search after
+        # the targets close to it, whose separators are the ones that disconnect the most units
+        order = [self.headquarters]
+        seen = {self.headquarters}
+        for v in order:
+            for w in self.adj[v]:
+                if w not in seen:
+                    seen.add(w)
+                    order.append(w)
+
+        # The cut closest to the headquarters separates each target together with everything behind it
+        s = n + index[self.headquarters]
+        separators = set()
+        for t in order[1:]:
+            if expired(deadline):
+                break
+
+            if flow.max_flow(s, index[t]) <= self.fire_power:
+                side = flow.source_side(s)
+                separators.add(tuple(v for i, v in enumerate(nodes) if side[i] and not side[n + i]))
+
+        return [list(attack) for attack in separators]
+
+    def gains(self, attack):
+        # Units each supplied unit would disconnect by itself (its own one included) in a single depth-first search:
+        # a child c of v whose subtree has no back edge above v is separated together with v
+        removed = set(attack)
+        root = self.headquarters
+
+        order = {root : 0}
+        low = {root : 0}
+        size = {root : 1}
+        gain = {root : 1}
+        stack = [(root, iter(self.adj[root]))]
+        while stack:
+            v, neighbors = stack[-1]
+
+            for w in neighbors:
+                if w in removed:
+                    continue
+
+                if w not in order:
+                    order[w] = low[w] = len(order)
+                    size[w] = gain[w] = 1
+                    stack.append((w, iter(self.adj[w])))
+                    break
+
+                low[v] = min(low[v], order[w])
+            else:
+                stack.pop()
+
+                if stack:
+                    u = stack[-1][0]
+                    low[u] = min(low[u], low[v])
+                    size[u] += size[v]
+
+                    if low[v] >= order[u]:
+                        gain[u] += size[v]
+
+        return gain
+
+    def greedy(self, attack=(), deadline=None):
+        attack = list(attack)
+        budget = self.fire_power - self.cost(attack)
+
+        while not expired(deadline):
+            # The supplied units are the ones reached by the search, so one pass per step ranks every candidate
+            gain = self.gains(attack)
+            candidates = [v for v in self.candidates if v in gain and self.endurance[v] <= budget]
+
+            if not candidates:
+                break
+
+            best = max(candidates, key=lambda v: (gain[v] / self.endurance[v], gain[v]))  # separated units per endurance
+
+            attack.append(best)
+            budget -= self.endurance[best]
+
+        return attack
+
+    def local_search(self, attack, deadline=None):
+        attack = list(attack)
+        value = self.value(attack)
+
+        improved = True
+        while improved:
+            improved = False
+
+            for move in self._moves(attack):
+                if expired(deadline):
+                    return attack
+
+                if self.cost(move) <= self.fire_power:
+                    move_value = self.value(move)
+
+                    if move_value > value:
+                        attack, value = move, move_value
+                        improved = True
+                        break
+
+        return attack
+
+    def _moves(self, attack):
+        # Adding one unit or swapping one unit of the attack for another
+        outside = [v for v in self.candidates if v not in attack]
+
+        for drop in [None] + attack:
+            kept = [v for v in attack if v != drop]
+            for v in outside:
+                yield kept + [v]
+
+        # Adding or swapping in pairs of close units, which are needed to separate regions of a grid
+        for drop in [None] + attack:
+            kept = [v for v in attack if v != drop]
+            for v in outside:
+                for w in self._close_units(v):
+                    if v < w and w not in attack:
+                        yield kept + [v, w]
+
+    def _close_units(self, v):
+        close = set(self.adj[v])
+        for u in self.adj[v]:
+            close.update(self.adj[u])
+
+        return [w for w in close if w in self.attackable]
+
+    def solve(self, max_seconds=None):
+        # One deadline is shared by every stage, so max_seconds bounds the whole call and
+        # the greedy start found first is returned when it runs out
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+
+        # The separators get half of the time, so that the ones found are still completed and improved
+        search = None if max_seconds is None else time.perf_counter() + max_seconds/2
+
+        # Completing each affordable layer and separator greedily and improving the best start found
+        starts = [self.greedy(deadline=deadline)]
+        for attack in self.layers() + self.separators(search):
+            if expired(deadline):
+                break
+
+            starts.append(self.greedy(attack, deadline))
+
+        return self.local_search(max(starts, key=self.value), deadline)
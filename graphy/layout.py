@@ -0,0 +1,23 @@
+from functools import lru_cache
+import numpy as np
+
+
+# Function that computes the positions of all cells of a rows x cols grid as one (rows*cols, 2) array
+# Cell v = r*cols + c is drawn at column r and row -c, so the rows of the grid are the vertical lines
+# of the drawing, and the longest side of the grid spans [-1, 1] keeping the cells square
+@lru_cache(maxsize=32)
+def grid_layout(rows, cols=None):
+    cols = rows if cols is None else cols
+
+    v = np.arange(rows*cols)
+    pos = np.empty((rows*cols, 2))
+    pos[:, 0] = v // cols
+    pos[:, 1] = -(v % cols)
+
+    pos -= pos.min(axis=0) + np.ptp(pos, axis=0) / 2
+    pos /= np.ptp(pos, axis=0).max() / 2 or 1
+
+    pos.setflags(write=False)  # the same array is shared by every caller
+
+    return pos
+
@@ -0,0 +1,203 @@
+import numpy as np
+from .components import to_csr
+
+
+# Roles of the nodes (the code of a role is its index) and the kinds of networks
+roles = (None, "origin", "dest", "headquarters", "secure")
+kinds = ("water", "military")
+
+
+# Class that stores a network of the generator as typed arrays
+# Edges are int32 arrays with a CSR adjacency, and removals only clear masks, so the arrays are never copied
+# The networkx graph returned by to_networkx is built on demand and cached until the network changes
+class GridNetwork:
+    __slots__ = ("kind", "shape", "n", "tails", "heads", "indptr", "indices", "edge_ids",
+                 "role", "endurance", "supplied", "red", "node_alive", "edge_alive", "seed", "_graph")
+
+    def __init__(self, kind, shape, edges, role=None, endurance=None, red=None, seed=None):
+        if kind not in kinds:
+            raise ValueError(f"kind must be one of {kinds}, got {kind!r}")
+
+        self.kind = kind
+        self.shape = tuple(shape)
+        self.n = n = self.shape[0]*self.shape[1]
+        self.seed = seed
+
+        edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        self.tails = np.ascontiguousarray(edges[:, 0])
+        self.heads = np.ascontiguousarray(edges[:, 1])
+        self.indptr, self.indices, self.edge_ids = to_csr(n, self.tails, self.heads)
+
+        m = len(edges)
+        self.role = np.zeros(n, dtype=np.int8) if role is None else np.asarray(role, dtype=np.int8)
+        self.endurance = np.zeros(n, dtype=np.int32) if endurance is None else np.asarray(endurance, dtype=np.int32)
+        self.red = np.zeros(m, dtype=bool) if red is None else np.asarray(red, dtype=bool)
+
+        self.supplied = np.ones(n, dtype=bool)  # flow for water networks and provided for military networks
+        self.node_alive = np.ones(n, dtype=bool)
+        self.edge_alive = np.ones(m, dtype=bool)
+
+        self._graph = None
+
+    @classmethod
+    def from_arrays(cls, network, seed=None):
+        # Networks drawn by GraphGenerator.water_arrays or GraphGenerator.military_arrays
+        n = network["shape"][0]*network["shape"][1]
+        role = np.zeros(n, dtype=np.int8)
+
+        if "headquarters" in network:
+            edges = network["edges"]
+            h = network["headquarters"]
+
+            role[edges[(edges == h).any(axis=1)]] = roles.index("secure")
+            role[h] = roles.index("headquarters")
+
+            return cls("military", network["shape"], edges, role, network["endurance"], seed=seed)
+
+        role[network["origin"]] = roles.index("origin")
+        role[network["dest"]] = roles.index("dest")
+
+        return cls("water", network["shape"], network["edges"], role, red=network["red"], seed=seed)
+
+    @classmethod
+    def from_networkx(cls, G):
+        side = int(np.ceil((max(G.nodes) + 1 if G else 0)**0.5))
+        shape = G.graph.get("shape", (side, side))
+        n = shape[0]*shape[1]
+        kind = "military" if any(e is not None for _, e in G.nodes.data("endurance")) else "water"
+
+        edges = np.array(list(G.edges), dtype=np.int32).reshape(-1, 2)
+        nodes = np.fromiter(G.nodes, dtype=np.int64, count=len(G))
+
+        role = np.zeros(n, dtype=np.int8)
+        role[nodes] = [roles.index(prop) for _, prop in G.nodes.data("node_prop")]
+
+        endurance = np.zeros(n, dtype=np.int32)
+        red = None
+        if kind == "military":
+            endurance[nodes] = [e for _, e in G.nodes.data("endurance")]
+        else:
+            red = np.array([color == "red" for _, _, color in G.edges.data("color")], dtype=bool)
+
+        network = cls(kind, shape, edges, role, endurance, red)
+        network.supplied[nodes] = [bool(s) for _, s in G.nodes.data("flow" if kind == "water" else "provided",
+                                                                     default=True)]
+        network.node_alive[:] = False
+        network.node_alive[nodes] = True
+
+        return network
+
+    def __getstate__(self):
+        return {name : getattr(self, name) for name in self.__slots__ if name != "_graph"}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+        self._graph = None
+
+    def copy(self):
+        network = object.__new__(GridNetwork)
+        network.__setstate__(self.__getstate__())
+
+        # Masks and attributes are copied, the structure arrays are shared
+        for name in ("role", "endurance", "supplied", "red", "node_alive", "edge_alive"):
+            setattr(network, name, getattr(self, name).copy())
+
+        return network
+
+    def number_of_nodes(self):
+        return int(self.node_alive.sum())
+
+    def number_of_edges(self):
+        return int(self.edge_alive.sum())
+
+    @property
+    def nodes(self):
+        return np.flatnonzero(self.node_alive)
+
+    @property
+    def edges(self):
+        alive = self.edge_alive
+        return np.stack([self.tails[alive], self.heads[alive]], axis=1)
+
+    def edge_list(self):
+        return list(zip(self.tails[self.edge_alive].tolist(), self.heads[self.edge_alive].tolist()))
+
+    def find(self, role):
+        nodes = np.flatnonzero((self.role == roles.index(role)) & self.node_alive)
+        return int(nodes[0]) if len(nodes) else None
+
+    def neighbors(self, v):
+        entries = slice(self.indptr[v], self.indptr[v+1])
+        alive = self.edge_alive[self.edge_ids[entries]]
+
+        return self.indices[entries][alive]
+
+    def edge_index(self, v, w):
+        entries = slice(self.indptr[v], self.indptr[v+1])
+        hits = np.flatnonzero(self.indices[entries] == w)
+
+        if not len(hits):
+            raise KeyError((v, w))
+
+        return int(self.edge_ids[entries][hits[0]])
+
+    def remove_edges_from(self, edges):
+        ids = [self.edge_index(v, w) for v, w in edges]
+        self.edge_alive[ids] = False
+        self._graph = None
+
+    def remove_nodes_from(self, nodes):
+        nodes = np.asarray(list(nodes), dtype=np.int64)
+        self.node_alive[nodes] = False
+
+        # Edges incident to removed nodes are removed as well
+        self.edge_alive &= self.node_alive[self.tails] & self.node_alive[self.heads]
+        self._graph = None
+
+    def interrupt(self, nodes):
+        nodes = np.asarray(list(nodes), dtype=np.int64)
+        self.supplied[nodes[self.node_alive[nodes]]] = False
+        self._graph = None
+
+    def snapshot(self):
+        # Copies of the masks changed by removals and interruptions, so that they can be undone with restore
+        return self.supplied.copy(), self.node_alive.copy(), self.edge_alive.copy()
+
+    def restore(self, snapshot):
+        self.supplied[:], self.node_alive[:], self.edge_alive[:] = snapshot
+        self._graph = None
+
+    def to_networkx(self):
+        if self._graph is not None:
+            return self._graph
+
+        import networkx as nx  # loaded only when a networkx view is asked for
+
+        G = nx.Graph(shape=self.shape)
+        nodes = self.nodes.tolist()
+        props = [roles[code] for code in self.role[nodes].tolist()]
+        supplied = self.supplied[nodes].tolist()
+
+        # Same attributes as the networks built by GraphGenerator.water_network and military_network
+        if self.kind == "water":
+            G.add_nodes_from((v, {"node_prop" : prop, "flow" : flow}) for v, prop, flow in zip(nodes, props, supplied))
+
+            G.add_edges_from((v, w, {"color" : "red" if red else "blue"})
+                             for v, w, red in zip(self.tails[self.edge_alive].tolist(),
+                                                  self.heads[self.edge_alive].tolist(),
+                                                  self.red[self.edge_alive].tolist()))
+        else:
+            G.add_nodes_from((v, {"node_prop" : prop, "endurance" : e, "provided" : provided})
+                             for v, prop, e, provided in zip(nodes, props, self.endurance[nodes].tolist(), supplied))
+
+            G.add_edges_from(self.edge_list())
+
+        self._graph = G
+
+        return G
+
+# Function that gets the array view of a network given either as a GridNetwork or as a networkx graph
+def as_grid(network):
+    return network if isinstance(network, GridNetwork) else GridNetwork.from_networkx(network)
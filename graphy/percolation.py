@@ -0,0 +1,130 @@
+import os
+from math import lgamma, log
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .generator import UnionFind
+from .network import as_grid
+
+
+# Function that runs the failure scenarios of a chunk with Newman-Ziff percolation
+# Each scenario adds the removable pipes (or units) in a random order, so that after k additions the network
+# is the one left when all but k of them failed, and a union-find records the state after every addition
+# Returns the states as (scenarios, m + 1) arrays, column k holding the state with k pipes (or units) present
+def percolation_chunk(network, scenarios, seed):
+    rng = np.random.default_rng(seed)
+    n = network.n
+    tails, heads = network.tails.tolist(), network.heads.tolist()
+
+    if network.kind == "water":
+        source, dest = network.find("origin"), network.find("dest")
+        alive = network.edge_alive
+        fixed = np.flatnonzero(alive & network.red).tolist()  # red pipes do not fail
+        items = np.flatnonzero(alive & ~network.red)
+    else:
+        source, dest = network.find("headquarters"), None
+        units = network.nodes
+        items = units[units != source]
+
+        # Edges of each unit, followed once the unit is back
+        edges = {}
+        for e in np.flatnonzero(network.edge_alive).tolist():
+            edges.setdefault(tails[e], []).append(heads[e])
+            edges.setdefault(heads[e], []).append(tails[e])
+
+    m = len(items)
+    total = network.number_of_nodes()
+    orders = rng.permuted(np.tile(items, (scenarios, 1)), axis=1).tolist()  # one random order per scenario
+
+    connected = np.zeros((scenarios, m + 1), dtype=bool)
+    supplied = np.zeros((scenarios, m + 1))
+
+    for i, order in enumerate(orders):
+        sets = UnionFind(n)
+        size = [1]*n
+        present = [False]*n
+        present[source] = True
+
+        def join(u, v):
+            root_u, root_v = sets.find(u), sets.find(v)
+            if sets.union(root_u, root_v):
+                size[root_u] += size[root_v]
+
+        if network.kind == "water":
+            for e in fixed:
+                join(tails[e], heads[e])
+
+        for k in range(m + 1):
+            if k:
+                item = order[k - 1]
+
+                if network.kind == "water":
+                    join(tails[item], heads[item])
+                else:
+                    present[item] = True
+                    for w in edges.get(item, []):
+                        if present[w]:
+                            join(item, w)
+
+            root = sets.find(source)
+            supplied[i, k] = size[root] / total
+            if dest is not None:
+                connected[i, k] = root == sets.find(dest)
+
+    return {"connected" : connected, "supplied" : supplied}
+
+# Function that gives the probability of each number of present items out of m when each fails with probability p
+def binomial_weights(m, probabilities):
+    k = np.arange(m + 1)
+    log_choose = np.array([lgamma(m + 1) - lgamma(j + 1) - lgamma(m - j + 1) for j in range(m + 1)])
+
+    weights = np.zeros((m + 1, len(probabilities)))
+    for j, p in enumerate(probabilities):
+        if p <= 0:
+            weights[m, j] = 1
+        elif p >= 1:
+            weights[0, j] = 1
+        else:
+            weights[:, j] = np.exp(log_choose + k*log(1 - p) + (m - k)*log(p))
+
+    return weights
+
+# Function that estimates how a network holds up under random failures, where each removable pipe (water) or
+# each unit other than the headquarters (military) fails independently with each of the given probabilities
+# Water networks get the probability that origin and destination stay connected and the fraction of nodes still
+# supplied by the origin, military networks the fraction of units still supplied by the headquarters
+# Scenarios are spread in chunks across a process pool, and every curve comes with its confidence interval
+def simulate_failures(network, scenarios=1000, probabilities=None, seed=None, workers=None, chunk_size=250,
+                      confidence=0.95):
+    network = as_grid(network)
+    probabilities = np.linspace(0, 1, 21) if probabilities is None else np.asarray(probabilities, dtype=float)
+
+    # Independent streams for the chunks, so that results do not depend on the number of workers
+    counts = [min(chunk_size, scenarios - start) for start in range(0, scenarios, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    workers = workers or os.cpu_count()
+
+    if workers == 1 or len(counts) == 1:
+        chunks = [percolation_chunk(network, count, s) for count, s in zip(counts, seeds)]
+    else:
+        with ProcessPoolExecutor(min(workers, len(counts))) as pool:
+            chunks = list(pool.map(percolation_chunk, [network]*len(counts), counts, seeds))
+
+    # Every scenario averaged over the number of failures (the states after k additions are equally likely
+    # to be any network with k items present), then the scenarios are averaged with each other
+    names = ["connected", "supplied"] if network.kind == "water" else ["supplied"]
+    z = NormalDist().inv_cdf(0.5 + confidence/2)
+    curves = {"probability" : probabilities}
+
+    for name in names:
+        states = np.concatenate([chunk[name] for chunk in chunks]).astype(float)
+        values = states @ binomial_weights(states.shape[1] - 1, probabilities)
+
+        mean = values.mean(axis=0)
+        margin = z*values.std(axis=0, ddof=1)/np.sqrt(len(values)) if len(values) > 1 else np.zeros_like(mean)
+
+        curves[name] = mean
+        curves[f"{name}_low"] = np.clip(mean - margin, 0, 1)
+        curves[f"{name}_high"] = np.clip(mean + margin, 0, 1)
+
+    return curves
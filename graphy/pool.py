@@ -0,0 +1,128 @@
+import time
+import queue
+import threading
+import numpy as np
+from .generator import GraphGenerator
+from .solvers import SolverWaterDistribution, SolverMilitaryDistribution
+
+
+# Class that keeps a bounded queue of networks that were already generated and solved
+# Worker threads refill the queue in the background (CBC runs outside the GIL), and pop hands out a
+# network with its optimal solution, waiting only when the queue ran empty
+# With a SolutionCache shared with other solvers, later solves of a popped network are cache hits
+class InstancePool:
+    def __init__(self, kind="water", N=100, fire_power=6, size=8, workers=2, seed=None, cache=None, backend="mip"):
+        if kind not in ("water", "military"):
+            raise ValueError(f"kind must be 'water' or 'military', got {kind!r}")
+
+        self.kind = kind
+        self.N = N
+        self.fire_power = fire_power
+        self.cache = cache
+        self.backend = backend
+
+        self.queue = queue.Queue(maxsize=size)
+        self.stop = threading.Event()
+        self.error = None  # first exception raised by a worker, raised again by pop
+
+        # Metrics
+        self.lock = threading.Lock()
+        self.produced = 0
+        self.served = 0
+        self.solve_time = 0.0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+        # Each worker draws its networks from its own independent stream
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        self.threads = [threading.Thread(target=self.refill, args=(s,), daemon=True) for s in seeds]
+
+        for thread in self.threads:
+            thread.start()
+
+    def produce(self, generator, solver):
+        start = time.perf_counter()
+
+        if self.kind == "water":
+            network = generator.water_grid()
+            solver.create_model(network)
+        else:
+            network = generator.military_grid()
+            solver.create_model(network, self.fire_power)
+
+        if solver.model is not None:
+            solver.model.verbose = 0
+
+        solver.optimize()
+
+        with self.lock:
+            self.produced += 1
+            self.solve_time += time.perf_counter() - start
+
+        return network, solver.solution
+
+    def refill(self, seed):
+        generator = GraphGenerator(self.N, seed)
+
+        try:
+            while not self.stop.is_set():
+                # A new solver for each network, since pooled networks are unrelated to each other (so their
+                # models are never updated and are better built over the reduced networks)
+                if self.kind == "water":
+                    solver = SolverWaterDistribution(self.backend, cache=self.cache, presolve=True)
+                else:
+                    solver = SolverMilitaryDistribution(cache=self.cache, presolve=True)
+
+                instance = self.produce(generator, solver)
+
+                # Waiting for room in the queue, but still leaving when the pool is closed
+                while not self.stop.is_set():
+                    try:
+                        self.queue.put(instance, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+        except Exception as error:
+            self.error = error
+
+    def pop(self, timeout=None):
+        start = time.perf_counter()
+
+        while True:
+            if self.error is not None and self.queue.empty():
+                raise self.error
+
+            try:
+                network, solution = self.queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if timeout is not None and time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"no {self.kind} network was ready after {timeout} seconds")
+
+        wait = time.perf_counter() - start
+        with self.lock:
+            self.served += 1
+            self.wait_time += wait
+            self.max_wait = max(self.max_wait, wait)
+
+        return network, solution
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        with self.lock:
+            return {"depth" : self.depth,
+                    "size" : self.queue.maxsize,
+                    "produced" : self.produced,
+                    "served" : self.served,
+                    "mean_solve_time" : self.solve_time / max(self.produced, 1),
+                    "mean_wait_time" : self.wait_time / max(self.served, 1),
+                    "max_wait_time" : self.max_wait}
+
+    def close(self):
+        self.stop.set()
+
+        for thread in self.threads:
+            thread.join()
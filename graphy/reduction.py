@@ -0,0 +1,329 @@
+import numpy as np
+from .cache import Solution
+from .components import connected_labels, reachable, to_csr
+
+
+# Function that finds the bridges of an undirected multigraph given by edge arrays with an iterative version
+# of Tarjan's algorithm (parallel edges are never bridges, since only the edge used to enter a node is skipped)
+def bridges(n, tails, heads):
+    indptr, indices, edge_ids = (array.tolist() for array in to_csr(n, tails, heads))
+
+    order = [-1]*n  # discovery order of each node
+    low = [0]*n  # lowest order reachable with at most one back edge
+    bridge = [False]*len(tails)
+    counter = 0
+
+    for root in range(n):
+        if order[root] >= 0:
+            continue
+
+        order[root] = low[root] = counter
+        counter += 1
+
+        stack = [(root, -1, indptr[root])]
+        while stack:
+            v, entry, i = stack[-1]
+
+            if i < indptr[v+1]:
+                stack[-1] = (v, entry, i + 1)
+                w, e = indices[i], edge_ids[i]
+
+                if e == entry:
+                    continue
+
+                if order[w] < 0:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append((w, e, indptr[w]))
+                else:
+                    low[v] = min(low[v], order[w])
+            else:
+                stack.pop()
+
+                if stack:
+                    u = stack[-1][0]
+                    low[u] = min(low[u], low[v])
+
+                    if low[v] > order[u]:
+                        bridge[entry] = True
+
+    return np.array(bridge, dtype=bool)
+
+# Function that follows the edges reachable from source and tells the nodes left after removing some edges
+def reached_nodes(network, source, removed_edges=(), removed_nodes=()):
+    keep = network.edge_alive.copy()
+    keep[list(removed_edges)] = False
+
+    if len(removed_nodes):
+        alive = network.node_alive.copy()
+        alive[list(removed_nodes)] = False
+        keep &= alive[network.tails] & alive[network.heads]
+
+    return reachable(network.indptr, network.indices, network.edge_ids, source, keep[None])[0]
+
+# Function that merges the tables of independent parts of an attack, where table[b] is the best value with
+# a budget of at most b, and splits[i][b] is the budget given to part i when b is shared by parts 0..i
+def knapsack_merge(tables, budget):
+    merged = np.zeros(budget + 1, dtype=np.int64)
+    splits = []
+
+    for table in tables:
+        # All ways of sharing b between the parts merged so far and the new part
+        b, c = np.tril_indices(budget + 1)
+        values = np.full((budget + 1, budget + 1), -1, dtype=np.int64)
+        values[b, c] = merged[b - c] + table[c]
+
+        splits.append(values.argmax(axis=1))
+        merged = values.max(axis=1)
+
+    return merged, splits
+
+
+# Class that reduces a water distribution network to a smaller weighted network with the same minimum cut
+# 1. Red pipes can not be removed, so their ends are contracted into one node
+# 2. Only the 2-edge-connected component with the origin and the destination is left, since any bridge
+#    between them is a cut of one pipe, and every other part can only be reached through that component
+# 3. Parallel pipes become one pipe whose weight is their number, and a node with only two neighbors is
+#    replaced by one pipe weighing the cheapest of its two
+# When the network is already solved by these rules, solution holds the answer and no model is needed
+class WaterReduction:
+    def __init__(self, network):
+        self.network = network
+        self.solution = None
+
+        origin, dest = network.find("origin"), network.find("dest")
+        self.original_origin = origin
+
+        alive = np.flatnonzero(network.edge_alive)
+        tails, heads, red = network.tails[alive], network.heads[alive], network.red[alive]
+
+        # Contracting the red pipes
+        label = connected_labels(network.n, tails[red], heads[red])
+        u, v = label[tails], label[heads]
+        loops = u == v
+        ids, u, v = alive[~loops], u[~loops], v[~loops]
+        s, t = label[origin], label[dest]
+
+        if s == t:
+            raise ValueError("origin and destination are joined by red pipes, so they can not be disconnected")
+
+        # Nothing to cut when the destination is already without supply
+        labels = connected_labels(network.n, u, v)
+        if labels[s] != labels[t]:
+            self.solution = self.restore_edges([])
+            return
+
+        is_bridge = bridges(network.n, u, v)
+        block = connected_labels(network.n, u[~is_bridge], v[~is_bridge])
+
+        # Every path between origin and destination uses the bridges that separate them, so one is enough
+        if block[s] != block[t]:
+            self.solution = self.restore_edges([ids[self.separating_bridge(u, v, is_bridge, block, s, t)]])
+            return
+
+        inside = (block[u] == block[s]) & (block[v] == block[s]) & ~is_bridge
+        self.contract(ids[inside], u[inside], v[inside], s, t)
+
+    def separating_bridge(self, u, v, is_bridge, block, s, t):
+        # The bridges join the components in a tree, and the last bridge of the path to t separates s and t
+        tree = {}
+        for i in np.flatnonzero(is_bridge).tolist():
+            a, b = int(block[u[i]]), int(block[v[i]])
+            tree.setdefault(a, []).append((b, i))
+            tree.setdefault(b, []).append((a, i))
+
+        entry = {int(block[s]) : None}
+        queue = [int(block[s])]
+        for a in queue:
+            for b, i in tree.get(a, []):
+                if b not in entry:
+                    entry[b] = i
+                    queue.append(b)
+
+        return entry[int(block[t])]
+
+    def contract(self, ids, u, v, s, t):
+        # Pipes of the reduced network as [weight, original pipes], with adj[a][b] the pipe between a and b
+        pipes = []
+        adj = {}
+
+        def add(a, b, weight, members):
+            if b in adj.setdefault(a, {}):
+                pipe = pipes[adj[a][b]]
+                pipe[0] += weight
+                pipe[1] += members
+            else:
+                adj[a][b] = adj.setdefault(b, {})[a] = len(pipes)
+                pipes.append([weight, members])
+
+        for e, a, b in zip(ids.tolist(), u.tolist(), v.tolist()):
+            add(a, b, 1, [e])
+
+        # Series reduction, repeated while some node has at most two neighbors
+        queue = [a for a in adj if a not in (s, t)]
+        while queue:
+            a = queue.pop()
+            if a not in adj or a in (s, t) or len(adj[a]) > 2:
+                continue
+
+            neighbors = list(adj[a])
+            removed = [pipes[adj[a][b]] for b in neighbors]
+
+            for b in neighbors:
+                del adj[b][a]
+            del adj[a]
+
+            if len(neighbors) == 2:
+                cheapest = min(removed, key=lambda pipe: pipe[0])
+                add(neighbors[0], neighbors[1], cheapest[0], list(cheapest[1]))
+
+            queue.extend(neighbors)
+
+        # Relabeling the nodes left as 0..n-1
+        nodes = sorted(adj)
+        index = {a : i for i, a in enumerate(nodes)}
+        edges = [(a, b, adj[a][b]) for a in nodes for b in adj[a] if a < b]
+
+        self.n = len(nodes)
+        self.tails = [index[a] for a, _, _ in edges]
+        self.heads = [index[b] for _, b, _ in edges]
+        self.weights = [pipes[p][0] for _, _, p in edges]
+        self.members = [pipes[p][1] for _, _, p in edges]
+        self.origin, self.dest = index[s], index[t]
+
+    def restore(self, chosen):
+        # Original pipes of the chosen pipes of the reduced network
+        return self.restore_edges([e for i in chosen for e in self.members[i]])
+
+    def restore_edges(self, cut):
+        network = self.network
+        reached = reached_nodes(network, self.original_origin, cut)
+
+        return Solution(float(len(cut)),
+                        np.flatnonzero(network.node_alive & ~reached).tolist(),
+                        list(zip(network.tails[cut].tolist(), network.heads[cut].tolist())))
+
+# Class that reduces a military distribution network by folding its pendant trees into value tables
+# Attacking a unit of a tree hanging from the rest of the network disconnects the whole subtree below it,
+# so the best attack of the trees hanging from a node r with a budget b is a tree knapsack, table[r][b]
+# The reduced network keeps the units outside the trees (the core), each one weighing 1 plus the size of its
+# trees, which are also disconnected when it is, and the model picks at most one budget for the trees of each
+# core unit that is still supplied
+class MilitaryReduction:
+    def __init__(self, network, fire_power):
+        self.network = network
+        self.fire_power = fire_power
+
+        n = network.n
+        B = fire_power
+        headquarters = network.find("headquarters")
+        endurance = network.endurance.tolist()
+        self.headquarters = headquarters
+
+        # Units cut off from the headquarters are always disconnected
+        supplied = reached_nodes(network, headquarters)
+        self.offset = int((network.node_alive & ~supplied).sum())
+
+        # Peeling leaves until only the core is left (the headquarters is never peeled)
+        alive = network.edge_alive & supplied[network.tails] & supplied[network.heads]
+        indptr, indices, edge_ids = network.indptr.tolist(), network.indices.tolist(), network.edge_ids.tolist()
+        alive = alive.tolist()
+
+        degree = [0]*n
+        for v in np.flatnonzero(supplied).tolist():
+            degree[v] = sum(alive[edge_ids[i]] for i in range(indptr[v], indptr[v+1]))
+
+        peeled = [False]*n
+        parent = [-1]*n
+        order = []
+        queue = [v for v in np.flatnonzero(supplied).tolist() if degree[v] == 1 and v != headquarters]
+
+        while queue:
+            v = queue.pop()
+            peeled[v] = True
+            order.append(v)
+
+            for i in range(indptr[v], indptr[v+1]):
+                w = indices[i]
+                if alive[edge_ids[i]] and not peeled[w]:
+                    parent[v] = w
+                    degree[w] -= 1
+
+                    if degree[w] == 1 and w != headquarters:
+                        queue.append(w)
+
+        # Core unit that each peeled unit hangs from
+        self.root = {}
+        for v in reversed(order):
+            self.root[v] = self.root.get(parent[v], parent[v])
+
+        # Tree knapsack over the peeled units, children first
+        children = {}
+        for v in order:
+            children.setdefault(parent[v], []).append(v)
+
+        self.children = children
+        self.splits = {}
+        self.attack = {}  # attack[v][b] tells if attacking v itself is the best use of the budget b
+        size = [1]*n
+        table = {}
+
+        for v in order:
+            kids = children.get(v, [])
+            size[v] += sum(size[w] for w in kids)
+
+            merged, self.splits[v] = knapsack_merge([table[w] for w in kids], B)
+            attack = np.zeros(B + 1, dtype=bool)
+            if endurance[v] <= B:
+                attack[endurance[v]:] = size[v] > merged[endurance[v]:]
+                merged = np.where(attack, size[v], merged)
+
+            table[v], self.attack[v] = merged, attack
+
+        # Core units with the tables of their trees
+        core = [v for v in np.flatnonzero(supplied).tolist() if not peeled[v]]
+        index = {v : i for i, v in enumerate(core)}
+
+        self.core = core
+        self.index = index
+        self.n = len(core)
+        self.weights = [1 + sum(size[w] for w in children.get(v, [])) for v in core]
+        self.endurance = [endurance[v] for v in core]
+        self.headquarters_index = index[headquarters]
+        self.tables = {}
+
+        for v in core:
+            if v in children:
+                self.tables[index[v]], self.splits[v] = knapsack_merge([table[w] for w in children[v]], B)
+
+        edges = [(v, indices[i]) for v in core for i in range(indptr[v], indptr[v+1])
+                 if alive[edge_ids[i]] and indices[i] in index and v < indices[i]]
+
+        self.tails = [index[v] for v, _ in edges]
+        self.heads = [index[w] for _, w in edges]
+
+    def tree_attack(self, v, budget):
+        # Units of the trees hanging from v attacked to reach table[v][budget]
+        if v in self.attack and self.attack[v][budget]:
+            return [v]
+
+        attack = []
+        kids = self.children.get(v, [])
+        for w, split in zip(reversed(kids), reversed(self.splits[v])):
+            spent = int(split[budget])
+            attack += self.tree_attack(w, spent)
+            budget -= spent
+
+        return attack
+
+    def restore(self, core_attack, budgets):
+        # core_attack has indices of core units, budgets maps core units to the budget spent on their trees
+        attack = [self.core[i] for i in core_attack]
+        for i, budget in budgets.items():
+            attack += self.tree_attack(self.core[i], budget)
+
+        network = self.network
+        reached = reached_nodes(network, self.headquarters, removed_nodes=attack)
+        disconnected = np.flatnonzero(network.node_alive & ~reached).tolist()
+
+        return Solution(float(len(disconnected)), disconnected, sorted(attack))
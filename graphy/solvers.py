@@ -1,98 +1,1018 @@
-from mip import Model, xsum, MAXIMIZE
+import time
+import numpy as np
+from mip import Model, xsum, MAXIMIZE, INF, INT_MAX, OptimizationStatus
+from .bulk import load_model, edge_rows
+from .cache import Solution
+from .cuts import PathCuts
+from .dynamic import BlockTreeDP
+from .flow import MaxFlow
+from .heuristics import MilitaryHeuristic
+from .network import as_grid
+from .reduction import WaterReduction, MilitaryReduction, reached_nodes
+from .stats import SolverStats, publish
 
 
+# Function that reads the last solution of a model so that it can be used as a MIP start
+def incumbent(model):
+    if not model.num_solutions:
+        return []
+
+    return [(var, var.x) for var in model.vars]
+
+default_gap = 1e-4  # relative gap at which python-mip stops by default
+first_nodes = 64  # branch and bound nodes of the first slice of an anytime search
+
+# Function that optimizes a model and records the search in stats, with status "optimal", "feasible" (stopped
+# within the relative gap asked for), "timeout" (stopped by max_seconds or max_nodes with a solution) or the one
+# of python-mip
+def run_model(model, stats, max_seconds=None, max_nodes=None):
+    start = time.perf_counter()
+    status = model.optimize(max_seconds=INF if max_seconds is None else max_seconds,
+                            max_nodes=INT_MAX if max_nodes is None else max_nodes)
+    stats.solve_time += time.perf_counter() - start
+
+    stats.gap = None
+
+    if model.num_solutions:
+        value, bound = model.objective_value, model.objective_bound
+        stats.gap = abs(value - bound) / max(abs(value), 1e-9)
+
+    if status == OptimizationStatus.OPTIMAL:
+        stats.status = "optimal" if stats.gap is None or stats.gap <= default_gap else "feasible"
+    elif model.num_solutions:
+        stats.status = "timeout"
+    else:
+        stats.status = status.name.lower()
+
+# Function that solves the model of a solver within max_seconds and reads its solution back
+# With on_incumbent the search runs in slices of branch and bound nodes that double, each one starting from the
+# best solution found so far (python-mip does not report the incumbents of CBC while it searches), and every
+# improving solution is given to on_incumbent(solution, bound, gap) as soon as its slice ends
+# Slices are counted in nodes rather than seconds, so every slice gets past the root of the search however slow
+# it is, and the last one takes whatever is left of max_seconds
+# When the search ends without any solution, the MIP start (if any) is the answer with status "timeout"
+def solve_model(solver, max_seconds=None, max_gap=None, on_incumbent=None):
+    model, stats = solver.model, solver.stats
+    model.max_mip_gap = default_gap if max_gap is None else max_gap
+    mip_start = model.start
+
+    searched = False  # the values of the model may still be the ones of a relaxation solved before
+    if on_incumbent is None:
+        run_model(model, stats, max_seconds)
+        searched = True
+    else:
+        start = time.perf_counter()
+        best = None
+        nodes = first_nodes
+
+        while True:
+            left = None if max_seconds is None else max_seconds - (time.perf_counter() - start)
+            if left is not None and left <= 0:
+                break
+
+            run_model(model, stats, left, nodes)
+            searched = True
+
+            if model.num_solutions:
+                if model.objective_value != best:
+                    best = model.objective_value
+                    on_incumbent(solver.read_solution(), model.objective_bound, stats.gap)
+
+                model.start = incumbent(model)
+
+            if stats.status not in ("timeout", "no_solution_found"):
+                break
+            nodes *= 2
+
+    if searched and model.num_solutions:
+        solver.solution = solver.read_solution()
+    elif mip_start:
+        values = {var.idx : value for var, value in mip_start}
+        solver.solution = solver.read_solution(lambda var: values.get(var.idx, 0.0))
+
+        stats.status = "timeout"
+    else:
+        raise TimeoutError(f"no solution was found in {max_seconds} seconds")
+
+# Function that counts the variables and constraints of the model a solver built
+def count_model(solver):
+    if solver.stats.engine == "mip":
+        solver.stats.variables = solver.model.num_cols
+        solver.stats.constraints = solver.model.num_rows
+
 # Class to solve the water distribution network
+# The backend "mip" solves the integer programming model and "maxflow" solves
+# the equivalent minimum cut problem with a combinatorial maximum flow algorithm
+# With a SolutionCache, networks solved before are answered without building or solving any model
+# With presolve the model is built over the WaterReduction of the network, which is smaller but built again
+# for every network, since the reduced networks do not keep the same variables; without it (the default) the
+# model of a network is kept and updated when the network only loses pipes, so presolve only pays off for
+# networks solved once (as the ones of an InstancePool or of a batch)
+# With relax only the linear relaxation is solved, since the model is a minimum cut with a totally unimodular
+# matrix, and a cut of its value is rounded from it (the branch and bound only runs if rounding fails)
+# The duals of the relaxation are then kept in flows, as the maximum flow that proves the cut optimal
 class SolverWaterDistribution:
-    def __init__(self):
+    backends = ("mip", "maxflow")
+    bulk_edges = 2000  # models with at least this many pipes are loaded at once instead of row by row
+    tolerance = 1e-6  # largest loss of value allowed when rounding the relaxation
+
+    def __init__(self, backend="mip", cache=None, presolve=False, callbacks=(), relax=True):
+        if backend not in self.backends:
+            raise ValueError(f"backend must be one of {self.backends}, got {backend!r}")
+
+        self.backend = backend
+        self.cache = cache
+        self.presolve = presolve
+        self.relax = relax
+        self.callbacks = list(callbacks)  # called with the SolverStats of every optimize
+
         self.model = None
+        self.solution = None
+        self.stats = None
+        self.key = None
+        self.reduction = None
 
         self.x = None
         self.y = None
+        self.constrs = None
+        self.flows = None
+        self.network = None
+
+        self.flow = None
+        self.edges = None
+        self.origin = None
+        self.dest = None
 
     def create_model(self, network):
+        self.stats = SolverStats()
+        start = time.perf_counter()
+
+        self.setup_model(network)
+
+        self.stats.build_time = time.perf_counter() - start
+        count_model(self)
+
+    def setup_model(self, network):
+        # Both networkx graphs and GridNetwork are read through the array view
+        network = as_grid(network)
+
+        self.solution = None
+        if self.cache is not None:
+            self.key = self.cache.key(network)
+            self.solution = self.cache.get(self.key)
+
+            if self.solution is not None:
+                self.stats.engine = "cache"
+                return
+
+        self.network = network
+
         # Getting the origin and destination
-        for node, prop in network.nodes.data("node_prop"):
-            if prop == "origin":
-                origin = node
-            elif prop == "dest":
-                dest = node
-        
+        origin = network.find("origin")
+        dest = network.find("dest")
+
+        if self.backend == "maxflow":
+            self.stats.engine = "maxflow"
+            self.create_flow_network(network, origin, dest)
+            return
+
+        self.stats.engine = "mip"
+        if self.presolve:
+            self.reduction = WaterReduction(network)
+            self.solution = self.reduction.solution  # some networks are solved by the reduction itself
+
+            if self.solution is None:
+                self.build_reduced_model(self.reduction)
+            else:
+                self.stats.engine = "reduction"
+            return
+
+        # Reusing the model of the same network when it only lost pipes, otherwise building a new one
+        if not self.update_model(network, origin, dest):
+            self.build_model(network, origin, dest)
+
+    def build_model(self, network, origin, dest):
         # Create a model
         self.model = Model()  # default is sense MINIMIZE and solver CBC
         
         # Defining the variables and objective function coefficients
-        self.x = x = [self.model.add_var(var_type="B")
-                      for _ in network.nodes]
-        self.y = y = {e : self.model.add_var(obj=1.0, var_type="B")
-                      for e in network.edges}
-            
-        # Defining the constraints
-        self.model += x[origin] == 0
-        self.model += x[dest] == 1
-        
-        for v, w, color in network.edges.data("color"):
-            self.model += y[v, w] >= x[v] - x[w]
-            self.model += y[v, w] >= x[w] - x[v]
-            
-            if color == "red":
-                self.model += y[v, w] == 0
-    
-    def optimize(self):
-        self.model.optimize()
+        edges = network.edge_list()
+
+        if len(edges) >= self.bulk_edges:
+            self.load_model(network, edges)
+        else:
+            self.x = x = [self.model.add_var(var_type="B")
+                          for _ in range(network.n)]
+            self.y = y = {e : self.model.add_var(obj=1.0, var_type="B")
+                          for e in edges}
+                
+            # Defining the constraints (kept by edge so that removed pipes can leave the model)
+            self.constrs = {(v, w) : [self.model.add_constr(y[v, w] >= x[v] - x[w]),
+                                      self.model.add_constr(y[v, w] >= x[w] - x[v])]
+                            for v, w in edges}
+
+        self.removed = set()
+        self.red = set()
+        self.origin = self.dest = None
+
+        self.set_bounds(network, origin, dest)
+
+    def load_model(self, network, edges):
+        # The same model as build_model, with its matrix written from the edge arrays
+        n, m = network.n, len(edges)
+        alive = network.edge_alive
+
+        rows, cols, values = edge_rows(network.tails[alive], network.heads[alive], [n + np.arange(m)])
+        variables, constrs = load_model(self.model, False, np.r_[np.zeros(n), np.ones(m)], np.ones(n + m),
+                                        rows, cols, values, np.full(2*m, ">="), np.zeros(2*m))
+
+        self.x = variables[:n]
+        self.y = dict(zip(edges, variables[n:]))
+        self.constrs = {e : constrs[2*k:2*k + 2] for k, e in enumerate(edges)}
+
+    def build_reduced_model(self, reduction):
+        self.model = Model()
+
+        # Pipes of the reduced network stand for several pipes, so they cost their weight
+        if len(reduction.tails) >= self.bulk_edges:
+            n, m = reduction.n, len(reduction.tails)
+            rows, cols, values = edge_rows(reduction.tails, reduction.heads, [n + np.arange(m)])
+            variables, constrs = load_model(self.model, False, np.r_[np.zeros(n), reduction.weights],
+                                            np.ones(n + m), rows, cols, values, np.full(2*m, ">="), np.zeros(2*m))
+
+            self.x = x = variables[:n]
+            self.y = variables[n:]
+            self.constrs = [constrs[2*e:2*e + 2] for e in range(m)]
+        else:
+            self.x = x = [self.model.add_var(var_type="B") for _ in range(reduction.n)]
+            self.y = y = [self.model.add_var(obj=weight, var_type="B") for weight in reduction.weights]
+
+            self.constrs = [[self.model.add_constr(y[e] >= x[v] - x[w]), self.model.add_constr(y[e] >= x[w] - x[v])]
+                            for e, (v, w) in enumerate(zip(reduction.tails, reduction.heads))]
+
+        x[reduction.origin].ub = 0
+        x[reduction.dest].lb = 1
+
+    def update_model(self, network, origin, dest):
+        if self.model is None:
+            return False
+
+        edges = {self.edge_key(v, w) for v, w in network.edge_list()}
+        if None in edges or len(self.x) != network.n:
+            return False
+
+        start = incumbent(self.model)
+
+        # Removed pipes lose their constraints and can no longer be chosen
+        for e in self.constrs.keys() - edges:
+            self.model.remove(self.constrs.pop(e))
+            self.y[e].ub = 0
+            self.removed.add(e)
+
+        # The previous solution stays feasible if the origin and destination did not move
+        if start and (origin, dest) == (self.origin, self.dest):
+            self.model.start = [(var, 0.0 if var.ub == 0 else value) for var, value in start]
+
+        self.set_bounds(network, origin, dest)
+
+        return True
+
+    def set_bounds(self, network, origin, dest):
+        x, y = self.x, self.y
+
+        # Origin and destination are fixed through bounds, so moving them is a change of bounds
+        if self.origin is not None:
+            x[self.origin].ub = 1
+            x[self.dest].lb = 0
+
+        x[origin].ub = 0
+        x[dest].lb = 1
+
+        self.origin, self.dest = origin, dest
+
+        # Red pipes can not be removed
+        red = network.red & network.edge_alive
+        red = {self.edge_key(v, w) for v, w in zip(network.tails[red].tolist(), network.heads[red].tolist())}
+
+        for e in red - self.red:
+            y[e].ub = 0
+        for e in self.red - red - self.removed:
+            y[e].ub = 1
+
+        self.red = red
+
+    def edge_key(self, v, w):
+        # Edges of an undirected network may be reported in any orientation
+        if (v, w) in self.constrs:
+            return v, w
+        if (w, v) in self.constrs:
+            return w, v
+
+        return None
+
+    def create_flow_network(self, network, origin, dest):
+        self.origin = origin
+        self.dest = dest
+
+        # Each pipe has unit capacity and red pipes can never be cut (capacity greater than any cut)
+        alive = network.edge_alive
+        self.edges = network.edge_list()
+        infinity = len(self.edges) + 1
+
+        capacities = np.where(network.red[alive], infinity, 1)
+
+        self.flow = MaxFlow(network.n, network.tails[alive], network.heads[alive], capacities)
+
+    def use_solution(self, solution):
+        # Answers the network with a solution found before (as the ones of an InstancePool), without any model
+        self.solution = solution
+        self.stats = SolverStats()
+        self.stats.engine = "pool"
+        self.stats.objective = solution.objective
+        self.stats.status = "optimal"
+
+    def optimize(self, max_seconds=None, max_gap=None, on_incumbent=None):
+        # The search stops after max_seconds or within the relative gap max_gap, and stats.status tells how
+        # it ended (only optimal solutions go to the cache)
+        stats = self.stats
+        start = time.perf_counter()
+
+        if self.solution is None:  # not answered by the cache or by the reduction
+            self.search(max_seconds, max_gap, on_incumbent)
+
+            if self.cache is not None and stats.status == "optimal":
+                self.cache.put(self.key, self.solution)
+
+        stats.extract_time = time.perf_counter() - start - stats.solve_time
+        stats.objective = self.solution.objective
+        stats.status = stats.status or "optimal"
+
+        publish(stats, self.callbacks)
+
+    def search(self, max_seconds=None, max_gap=None, on_incumbent=None):
+        if self.backend == "maxflow":
+            # The maximum flow is always exact and fast, so it takes no limits
+            start = time.perf_counter()
+            self.flow.max_flow(self.origin, self.dest)
+            self.stats.solve_time = time.perf_counter() - start
+            self.stats.status = "optimal"
+
+            self.solution = Solution(float(self.flow.value),
+                                     [node for node, reached in enumerate(self.flow.source_side(self.origin))
+                                      if not reached],
+                                     [self.edges[i] for i in self.flow.cut_edges(self.origin)])
+        elif not (self.relax and self.solve_relaxation()):
+            return solve_model(self, max_seconds, max_gap, on_incumbent)
+
+        # The maximum flow and the relaxation answer at once, with their cut as the only (optimal) incumbent
+        if on_incumbent is not None:
+            on_incumbent(self.solution, self.solution.objective, 0.0)
+
+    def solve_relaxation(self):
+        # Solves the linear relaxation and reads a minimum cut from it, which fails only if rounding loses value
+        # The relaxation takes no limits, since it is a single linear program
+        self.flows = None
+        start = time.perf_counter()
+
+        # The bounds 0 and 1 never cut off a minimum cut, but their duals would take part of the flow, so
+        # they are lifted while the relaxation is solved (the origin stays at most 0 and the destination at least 1)
+        ys = self.y.values() if isinstance(self.y, dict) else self.y
+        lifted = [(var, var.lb, var.ub) for var in self.x] + [(var, var.lb, var.ub) for var in ys if var.ub == 1]
+
+        for var in self.x:
+            if var.lb == 0:
+                var.lb = -INF
+            if var.ub == 1:
+                var.ub = INF
+        for var, _, _ in lifted[len(self.x):]:
+            var.ub = INF
+
+        cut = None
+        if self.model.optimize(relax=True) == OptimizationStatus.OPTIMAL:
+            cut = self.round_relaxation()
+
+        if cut is not None:
+            self.solution = self.read_relaxation(cut)
+            if not self.valid_relaxation(cut):
+                self.solution, cut = None, None
+
+        if cut is not None:
+            # Pipe v-w is in the rows y >= x[v] - x[w] and y >= x[w] - x[v], so their duals are the flows from w
+            # to v and from v to w, leaving the origin (x <= 0) towards the destination (x >= 1)
+            rows = self.constrs.items() if isinstance(self.constrs, dict) else enumerate(self.constrs)
+            self.flows = {e : (pair[1].pi or 0.0) - (pair[0].pi or 0.0) for e, pair in rows}
+
+        for var, lb, ub in lifted:
+            var.lb, var.ub = lb, ub
+
+        self.stats.solve_time += time.perf_counter() - start
+
+        if cut is not None:
+            self.stats.status = "optimal"
+            self.stats.gap = 0.0
+
+        return cut is not None
+
+    def round_relaxation(self):
+        # The optimum of the relaxation may lie between vertices, but the cuts {x >= t} for t in (0, 1] cost
+        # the value of the relaxation on average, so the cheapest of them is a minimum cut
+        if self.presolve:
+            keys = range(len(self.reduction.tails))
+            tails, heads = np.array(self.reduction.tails), np.array(self.reduction.heads)
+            weights = np.array(self.reduction.weights, dtype=float)
+        else:
+            keys = list(self.constrs)  # the pipes still in the network
+            tails, heads = np.array(keys, dtype=int).reshape(-1, 2).T
+            weights = np.array([np.inf if self.y[e].ub == 0 else 1.0 for e in keys])  # red pipes can not be cut
+
+        x = np.clip([var.x for var in self.x], 0, 1)
+        low, high = np.minimum(x[tails], x[heads]), np.maximum(x[tails], x[heads])
+
+        # Pipe e is cut by every threshold in (low[e], high[e]], so the cost of t is the weight of the pipes
+        # with high >= t minus the weight of those with low >= t (differences within the tolerance are noise
+        # of the solver, so thresholds are only taken in (tolerance, 1 - tolerance])
+        tol = self.tolerance
+        thresholds = np.unique(np.clip(high[(high > low + tol) & (high > tol)], None, 1 - tol))
+        if not len(thresholds):
+            return None
+
+        finite = np.where(np.isinf(weights), 0.0, weights)
+        by_high, by_low = np.argsort(high), np.argsort(low)
+        above = lambda values, order, w: np.r_[np.cumsum(w[order][::-1])[::-1], 0.0][
+            np.searchsorted(values[order], thresholds)]
+        costs = above(high, by_high, finite) - above(low, by_low, finite)
+        costs[above(high, by_high, weights == np.inf) > above(low, by_low, weights == np.inf)] = np.inf
+
+        t = thresholds[np.argmin(costs)]
+        if costs.min() > self.model.objective_value + tol:
+            return None
+
+        return [keys[e] for e in np.flatnonzero((low < t) & (t <= high)).tolist()]
+
+    def valid_relaxation(self, cut):
+        # A rounded cut is only trusted if it has no red pipe and the destination really loses its supply
+        network = self.network
+        if not self.presolve and any(self.y[e].ub == 0 for e in cut):
+            return False
+
+        return network.find("dest") in set(self.solution.disconnected)
+
+    def read_relaxation(self, cut):
+        # Nodes without supply are the ones the origin no longer reaches, since x does not tell them apart
+        if self.presolve:
+            return self.reduction.restore(cut)
+
+        network = self.network
+        reached = reached_nodes(network, self.origin, [network.edge_index(v, w) for v, w in cut])
+
+        return Solution(float(len(cut)), np.flatnonzero(network.node_alive & ~reached).tolist(), cut)
+
+    def read_solution(self, value=None):
+        # Solution of the model, or of the values given by value(var) when there is one (as for a MIP start)
+        read = value or (lambda var: var.x)
+
+        if self.presolve:
+            return self.reduction.restore([e for e, var in enumerate(self.y) if read(var) >= 0.5])
+
+        cut = [edge for edge, var in self.y.items() if read(var) >= 0.5]
+        return Solution(float(len(cut)), [node for node, var in enumerate(self.x) if read(var) >= 0.5], cut)
 
     @property
     def objective_value(self):
-        return self.model.objective_value
+        return self.solution.objective
 
     @property
     def disconnected_nodes(self):
-        return [node for node, var in enumerate(self.x) if var.x]
+        return self.solution.disconnected
 
     @property
     def edges_to_remove(self):
-        return [edge for edge, var in self.y.items() if var.x]
+        return self.solution.cut
 
 # Class to solve the military distribution network
+# With warm_start the model receives the attack found by the heuristic as a MIP start, which optimize runs
+# within its max_seconds (for at most heuristic_seconds), so a search that finds nothing better returns it
+# (heuristic_seconds=None lets the heuristic try every separator however long it takes, a max flow per unit)
+# With a SolutionCache, networks solved before with the same fire power are answered without any model
+# With presolve the model is built over the MilitaryReduction of the network, without its pendant trees, and
+# is built again for every network; without it (the default) the model of a network is kept and updated when
+# the network only loses units or edges, so presolve only pays off for networks solved once
+# The engine "dp" solves the problem with the BlockTreeDP instead of a model, and "auto" does so whenever
+# the blocks of the network have at most max_width attackable units (with "dp", wider networks raise a
+# ValueError, since the dynamic program enumerates 2**width attacks of a block)
+# The formulation "compact" has two rows per edge, while "lazy" starts from a seed of path constraints and adds
+# the violated ones as they are needed (see PathCuts)
 class SolverMilitaryDistribution:
-    def __init__(self):
+    engines = ("auto", "mip", "dp")
+    formulations = ("compact", "lazy")
+    max_width = 10
+    bulk_edges = 2000  # models with at least this many edges are loaded at once instead of row by row
+    heuristic_share = 0.5  # largest share of max_seconds given to the heuristic of the warm start
+
+    def __init__(self, warm_start=True, heuristic_seconds=1.0, cache=None, presolve=False, engine="auto",
+                 callbacks=(), formulation="compact"):
+        if engine not in self.engines:
+            raise ValueError(f"engine must be one of {self.engines}, got {engine!r}")
+        if formulation not in self.formulations:
+            raise ValueError(f"formulation must be one of {self.formulations}, got {formulation!r}")
+
+        self.warm_start = warm_start
+        self.heuristic_seconds = heuristic_seconds
+        self.cache = cache
+        self.presolve = presolve
+        self.engine = engine
+        self.formulation = formulation
+        self.callbacks = list(callbacks)  # called with the SolverStats of every optimize
+
         self.model = None
+        self.solution = None
+        self.stats = None
+        self.key = None
+        self.reduction = None
 
         self.x = None
         self.y = None
+        self.constrs = None
+        self.cuts = None
+        self.heuristic = None
 
     def create_model(self, network, fire_power=6):
+        self.stats = SolverStats()
+        start = time.perf_counter()
+
+        self.setup_model(network, fire_power)
+
+        self.stats.build_time = time.perf_counter() - start
+        count_model(self)
+
+    def setup_model(self, network, fire_power):
+        grid = as_grid(network)
+
+        self.solution = None
+        self.heuristic = None
+        if self.cache is not None:
+            self.key = self.cache.key(grid, fire_power)
+            self.solution = self.cache.get(self.key)
+
+            if self.solution is not None:
+                self.stats.engine = "cache"
+                return
+
+        # A model that update_model reuses was already built instead of the dynamic program for this network,
+        # so the blocks are only searched for networks that get a new model
+        if self.engine == "dp" or (self.engine == "auto" and not self.reusable(grid)):
+            dp = BlockTreeDP(grid, fire_power)
+
+            if self.use_dp(dp):
+                self.stats.engine = "dp"
+                self.solution = dp.solve()
+                return
+
+        self.stats.engine = "mip"
+        if self.presolve:
+            self.reduction = MilitaryReduction(grid, fire_power)
+            self.build_reduced_model(self.reduction, fire_power)
+
+            if self.warm_start:
+                self.heuristic = MilitaryHeuristic(network, fire_power)
+            return
+
+        # Reusing the model of the same network when it only lost nodes or edges, otherwise building a new one
+        if not self.update_model(grid, fire_power):
+            self.build_model(grid, fire_power)
+
+            if self.warm_start:
+                self.heuristic = MilitaryHeuristic(network, fire_power)
+
+    def use_dp(self, dp):
+        if dp.width <= self.max_width:
+            return True
+        if self.engine == "dp":
+            raise ValueError(f"the blocks of the network have {dp.width} attackable units, more than the "
+                             f"{self.max_width} the dynamic program can enumerate (max_width)")
+
+        return False
+
+    def build_model(self, network, fire_power):
         # Create a model
         self.model = Model(sense=MAXIMIZE)
-        
-        # Defining the variables and objective function coefficients
-        self.x = x = [None]*network.number_of_nodes()
-        self.y = y = [None]*network.number_of_nodes()
-        
-        for v, prop in network.nodes.data("node_prop"):
-            x[v] = self.model.add_var(obj=1.0, var_type="B")
-            y[v] = self.model.add_var(var_type="B")
+        edges = network.edge_list()
+        self.cuts = None
+
+        if self.formulation == "lazy":
+            self.x = [self.model.add_var(obj=1.0, var_type="B", ub=float(alive)) for alive in network.node_alive]
+            self.y = [self.model.add_var(var_type="B", ub=float(alive)) for alive in network.node_alive]
+            self.constrs = None  # path constraints do not belong to edges, so the model is not updated
+
+            self.add_path_cuts(network.n, network.tails[network.edge_alive].tolist(),
+                               network.heads[network.edge_alive].tolist(), network.find("headquarters"))
+        elif len(edges) >= self.bulk_edges:
+            self.load_model(network, edges)
+        else:
+            # Defining the variables and objective function coefficients
+            self.x = x = [None]*network.n
+            self.y = y = [None]*network.n
             
-            if prop == "headquarters":
-                self.model += x[v] == 0
-        
-        # Defining the constraints
-        self.model += xsum(c_i*y[i] for i, c_i in network.nodes.data("endurance")) <= fire_power
-        
-        for v, w in network.edges:
-            self.model += y[v] + y[w] >= x[v] - x[w]
-            self.model += y[v] + y[w] >= x[w] - x[v]
+            for v in range(network.n):
+                x[v] = self.model.add_var(obj=1.0, var_type="B")
+                y[v] = self.model.add_var(var_type="B")
+
+            # Cells without a military unit are neither counted nor attacked
+            for v in np.flatnonzero(~network.node_alive).tolist():
+                x[v].ub = 0
+                y[v].ub = 0
+            
+            # Defining the constraints (kept by edge so that removed edges can leave the model)
+            self.constrs = {(v, w) : [self.model.add_constr(y[v] + y[w] >= x[v] - x[w]),
+                                      self.model.add_constr(y[v] + y[w] >= x[w] - x[v])]
+                            for v, w in edges}
+
+        self.nodes = set(network.nodes.tolist())
+        self.headquarters = None
+        self.endurance = None
+        self.budget = None
+        self.fire_power = None
+
+        self.set_bounds(network, fire_power)
+
+    def load_model(self, network, edges):
+        # The same model as build_model, with its matrix written from the edge arrays
+        n, m = network.n, len(edges)
+        tails, heads = network.tails[network.edge_alive], network.heads[network.edge_alive]
+        alive = network.node_alive.astype(float)
+
+        rows, cols, values = edge_rows(tails, heads, [n + tails, n + heads])
+        variables, constrs = load_model(self.model, True, np.r_[np.ones(n), np.zeros(n)], np.r_[alive, alive],
+                                        rows, cols, values, np.full(2*m, ">="), np.zeros(2*m))
+
+        self.x, self.y = variables[:n], variables[n:]
+        self.constrs = {e : constrs[2*k:2*k + 2] for k, e in enumerate(edges)}
+
+    def build_reduced_model(self, reduction, fire_power):
+        self.model = Model(sense=MAXIMIZE)
+
+        self.cuts = None
+
+        # A core unit that is disconnected takes the units of its trees with it
+        if self.formulation == "lazy":
+            self.x = x = [self.model.add_var(obj=weight, var_type="B") for weight in reduction.weights]
+            self.y = y = [self.model.add_var(var_type="B") for _ in range(reduction.n)]
+
+            self.add_path_cuts(reduction.n, reduction.tails, reduction.heads, reduction.headquarters_index)
+        elif len(reduction.tails) >= self.bulk_edges:
+            n, m = reduction.n, len(reduction.tails)
+            tails, heads = np.array(reduction.tails), np.array(reduction.heads)
+
+            rows, cols, values = edge_rows(tails, heads, [n + tails, n + heads])
+            variables, _ = load_model(self.model, True, np.r_[reduction.weights, np.zeros(n)], np.ones(2*n),
+                                      rows, cols, values, np.full(2*m, ">="), np.zeros(2*m))
+
+            self.x = x = variables[:n]
+            self.y = y = variables[n:]
+        else:
+            self.x = x = [self.model.add_var(obj=weight, var_type="B") for weight in reduction.weights]
+            self.y = y = [self.model.add_var(var_type="B") for _ in range(reduction.n)]
+
+            for v, w in zip(reduction.tails, reduction.heads):
+                self.model.add_constr(y[v] + y[w] >= x[v] - x[w])
+                self.model.add_constr(y[v] + y[w] >= x[w] - x[v])
+
+        x[reduction.headquarters_index].ub = 0
+
+        # One budget level at most for the trees of each supplied core unit, worth the value in its table
+        self.z = {}
+        for v, table in reduction.tables.items():
+            self.z[v] = {b : self.model.add_var(obj=float(table[b]), var_type="B")
+                         for b in range(1, fire_power + 1) if table[b] > table[b-1]}
+
+            if self.z[v]:
+                self.model.add_constr(xsum(self.z[v].values()) <= 1 - x[v])
+
+        self.budget = self.model.add_constr(xsum(c*y[v] for v, c in enumerate(reduction.endurance)) +
+                                            xsum(b*var for z in self.z.values() for b, var in z.items())
+                                            <= fire_power)
+
+    def add_path_cuts(self, n, tails, heads, headquarters):
+        self.cuts = PathCuts(n, tails, heads, headquarters, self.x, self.y)
+        self.cuts.seed(self.model)
+
+    def run_heuristic(self, max_seconds=None):
+        # The heuristic gets heuristic_seconds but never more than a share of the time left to the search
+        seconds = self.heuristic_seconds
+        if max_seconds is not None:
+            seconds = min(INF if seconds is None else seconds, self.heuristic_share*max_seconds)
+
+        heuristic, self.heuristic = self.heuristic, None
+        if self.presolve:
+            self.set_reduced_start(heuristic, seconds)
+        else:
+            self.set_start(heuristic, seconds)
+
+    def set_reduced_start(self, heuristic, max_seconds=None):
+        reduction = self.reduction
+
+        attack = set(heuristic.solve(max_seconds))
+        disconnected = set(heuristic.disconnected_nodes(attack))
+
+        # Budget spent by the attack on the trees of each supplied core unit
+        spent = {}
+        for v in attack:
+            if v in reduction.root and reduction.root[v] not in disconnected:
+                i = reduction.index[reduction.root[v]]
+                spent[i] = spent.get(i, 0) + heuristic.endurance[v]
+
+        start = [(self.x[i], float(v in disconnected)) for i, v in enumerate(reduction.core)] + \
+                [(self.y[i], float(v in attack)) for i, v in enumerate(reduction.core)]
+
+        for i, b in spent.items():
+            levels = [level for level in self.z[i] if level <= b]
+            if levels:
+                start.append((self.z[i][max(levels)], 1.0))
+
+        self.model.start = start
+
+    def reusable(self, network):
+        # The model of the network is kept while the network only loses nodes or edges
+        if self.presolve or self.model is None or self.constrs is None:
+            return False
+
+        edges = {self.edge_key(v, w) for v, w in network.edge_list()}
+        return None not in edges and len(self.x) == network.n and set(network.nodes.tolist()) <= self.nodes
+
+    def update_model(self, network, fire_power):
+        if not self.reusable(network):
+            return False
+
+        nodes = set(network.nodes.tolist())
+        edges = {self.edge_key(v, w) for v, w in network.edge_list()}
+        start = incumbent(self.model)
+
+        # Removed military units can neither be counted nor attacked
+        for v in self.nodes - nodes:
+            self.x[v].ub = 0
+            self.y[v].ub = 0
+
+        # Removed edges lose their constraints
+        for e in self.constrs.keys() - edges:
+            self.model.remove(self.constrs.pop(e))
+
+        self.nodes = nodes
+
+        # The previous solution stays feasible while the headquarters and the budget do not change
+        if start:
+            self.model.start = [(var, 0.0 if var.ub == 0 else value) for var, value in start]
+
+        self.set_bounds(network, fire_power)
+
+        return True
+
+    def set_bounds(self, network, fire_power):
+        x, y = self.x, self.y
+
+        # The headquarters is fixed through bounds, so a new headquarters is a change of bounds
+        headquarters = network.find("headquarters")
+
+        if headquarters != self.headquarters:
+            if self.headquarters in self.nodes:
+                x[self.headquarters].ub = 1
+
+            x[headquarters].ub = 0
+            self.headquarters = headquarters
+
+        # The budget constraint is only rebuilt when endurances change, otherwise only its right-hand side
+        nodes = network.nodes
+        endurance = dict(zip(nodes.tolist(), network.endurance[nodes].tolist()))
+
+        if self.endurance is None or any(self.endurance[v] != c for v, c in endurance.items()):
+            if self.budget is not None:
+                self.model.remove(self.budget)
+
+            self.budget = self.model.add_constr(xsum(c*y[v] for v, c in endurance.items()) <= fire_power)
+            self.endurance = endurance
+        elif fire_power != self.fire_power:
+            self.budget.rhs = fire_power
+
+        self.fire_power = fire_power
+
+    def edge_key(self, v, w):
+        # Edges of an undirected network may be reported in any orientation
+        if (v, w) in self.constrs:
+            return v, w
+        if (w, v) in self.constrs:
+            return w, v
+
+        return None
+
+    def set_start(self, heuristic, max_seconds=None):
+        attack = set(heuristic.solve(max_seconds))
+        disconnected = set(heuristic.disconnected_nodes(attack))
+
+        self.model.start = [(self.x[v], float(v in disconnected)) for v in heuristic.adj] + \
+                           [(self.y[v], float(v in attack)) for v in heuristic.adj]
+
+    def use_solution(self, solution):
+        # Answers the network with a solution found before (as the ones of an InstancePool), without any model
+        self.solution = solution
+        self.stats = SolverStats()
+        self.stats.engine = "pool"
+        self.stats.objective = solution.objective
+        self.stats.status = "optimal"
+
+    def optimize(self, max_seconds=None, max_gap=None, on_incumbent=None):
+        # The search stops after max_seconds or within the relative gap max_gap, and stats.status tells how
+        # it ended (only optimal solutions go to the cache)
+        stats = self.stats
+        start = time.perf_counter()
+
+        if self.solution is None:  # not answered by the cache or by the dynamic program
+            self.search(max_seconds, max_gap, on_incumbent)
+
+            if self.cache is not None and stats.status == "optimal":
+                self.cache.put(self.key, self.solution)
+
+        stats.extract_time = time.perf_counter() - start - stats.solve_time
+        stats.objective = self.solution.objective
+        stats.status = stats.status or "optimal"
+
+        publish(stats, self.callbacks)
+
+    def search(self, max_seconds=None, max_gap=None, on_incumbent=None):
+        # The heuristic and the cutting loop of the lazy formulation run inside max_seconds, before the model
+        start = time.perf_counter()
+
+        def left():
+            return None if max_seconds is None else max(max_seconds - (time.perf_counter() - start), 0)
+
+        if self.heuristic is not None:
+            self.run_heuristic(left())
+
+        if self.cuts is None:
+            self.stats.solve_time += time.perf_counter() - start
+            return solve_model(self, left(), max_gap, on_incumbent)
+
+        mip_start = self.model.start
+        self.cuts.tighten(self.model, max_seconds=left())
+        self.model.start = mip_start
+        self.stats.solve_time += time.perf_counter() - start
+
+        self.search_paths(left, max_gap, on_incumbent)
+
+    def search_paths(self, left, max_gap=None, on_incumbent=None):
+        # The model with the path constraints found so far is a relaxation of the problem, so its optimum is
+        # the answer once it violates none of them; otherwise the violated ones are added and the model is
+        # solved again, starting from the attack repaired to disconnect only the units it really separates
+        model, stats = self.model, self.stats
+        best = None
+
+        while True:
+            solve_model(self, left(), max_gap)
+
+            if not model.num_solutions:  # out of time, answered by the start
+                return
+
+            values = incumbent(model)
+            xs, ys = [var.x for var in self.x], [var.x for var in self.y]
+            bound = model.objective_bound
+
+            paths = self.cuts.violated(xs, ys)
+            if paths:
+                start = time.perf_counter()
+                self.cuts.add(model, paths)
+
+                separated = self.cuts.separated(ys)
+                lowered = {var.idx for var, cut in zip(self.x, separated) if not cut}
+                values = [(var, 0.0 if var.idx in lowered else value) for var, value in values]
+                model.start = values
+
+                repaired = {var.idx : value for var, value in values}
+                self.solution = self.read_solution(lambda var: repaired[var.idx])
+                stats.solve_time += time.perf_counter() - start
+
+            # Only attacks that satisfy every path constraint are reported, with the bound of the relaxation
+            if on_incumbent is not None and (best is None or self.solution.objective > best):
+                best = self.solution.objective
+                on_incumbent(self.solution, bound, abs(bound - best) / max(abs(best), 1e-9))
+
+            if not paths:
+                return
+
+            if stats.status not in ("optimal", "feasible"):  # out of time with a repaired attack
+                stats.status = "timeout"
+                stats.gap = abs(bound - self.solution.objective) / max(abs(self.solution.objective), 1e-9)
+                return
+
+    def read_solution(self, value=None):
+        # Solution of the model, or of the values given by value(var) when there is one (as for a MIP start)
+        read = value or (lambda var: var.x)
+
+        if self.presolve:
+            return self.reduction.restore([v for v, var in enumerate(self.y) if read(var) >= 0.5],
+                                          {v : b for v, z in self.z.items() for b, var in z.items()
+                                           if read(var) >= 0.5})
+
+        disconnected = [node for node, var in enumerate(self.x) if read(var) >= 0.5]
+        return Solution(self.model.objective_value if value is None else float(len(disconnected)),
+                        disconnected, [node for node, var in enumerate(self.y) if read(var) >= 0.5])
+
+    def fire_power_curve(self, network, max_fire_power=None):
+        # Best attack for every fire power from 1 until every unit but the headquarters is disconnected (or
+        # until max_fire_power), as a dict fire power -> Solution
+        grid = as_grid(network)
+        headquarters = grid.find("headquarters")
+        saturated = grid.number_of_nodes() - 1
+
+        self.stats = SolverStats()
+        start = time.perf_counter()
+
+        # Fire powers at which a unit becomes affordable, the only points where the ceiling below can grow
+        endurance = grid.endurance[grid.nodes]
+        levels = np.unique(endurance[grid.nodes != headquarters]).tolist()
+
+        # With every affordable unit attacked, nothing more is disconnected until the next level
+        def ceiling(b):
+            attack = grid.nodes[(endurance <= b) & (grid.nodes != headquarters)]
+            return saturated + 1 - int(reached_nodes(grid, headquarters, removed_nodes=attack).sum())
+
+        def done(b):
+            return max_fire_power is not None and b > max_fire_power
+
+        if self.engine != "mip" and max_fire_power is not None:
+            # The tables of one dynamic program hold the answer for every smaller budget
+            dp = BlockTreeDP(grid, max_fire_power)
+
+            if self.use_dp(dp):
+                self.stats.engine = "dp"
+                curve = {b : dp.solve(b) for b in range(1, max_fire_power + 1)}
+                self.stats.solve_time = time.perf_counter() - start
+
+                return self.store_curve(grid, curve, start)
+
+        # One model for the whole curve, only the right-hand side of the budget changes from a point to the next
+        self.stats.engine = "mip"
+        self.reduction = None
+        self.build_model(grid, 1)
+        if self.warm_start:
+            self.set_start(MilitaryHeuristic(network, 1), self.heuristic_seconds)
+
+        self.stats.build_time = time.perf_counter() - start
+        count_model(self)
+
+        curve = {}
+        b = 1
+        while not done(b):
+            self.set_bounds(grid, b)
+            run_model(self.model, self.stats)
+
+            solution = Solution(self.model.objective_value,
+                                [v for v, var in enumerate(self.x) if var.x >= 0.5],
+                                [v for v, var in enumerate(self.y) if var.x >= 0.5])
+            curve[b] = solution
+
+            if solution.objective >= saturated:
+                break
+
+            # The attack found stays feasible with a larger budget, so it starts the next point
+            self.model.start = incumbent(self.model)
+
+            following = b + 1
+            if solution.objective >= ceiling(b):
+                following = next((level for level in levels if level > b), None)
+                if following is None:
+                    break
+
+            for skipped in range(b + 1, following):
+                if done(skipped):
+                    break
+                curve[skipped] = solution
+
+            b = following
+
+        return self.store_curve(grid, curve, start)
+
+    def store_curve(self, grid, curve, start):
+        self.solution = curve[max(curve)] if curve else None
+
+        if self.cache is not None:
+            for b, solution in curve.items():
+                self.cache.put(self.cache.key(grid, b), solution)
+
+        stats = self.stats
+        stats.extract_time = time.perf_counter() - start - stats.build_time - stats.solve_time
+        stats.objective = self.solution.objective if curve else None
+        stats.status = stats.status or "optimal"
+
+        publish(stats, self.callbacks)
 
-    def optimize(self):
-        self.model.optimize()
+        return curve
 
     @property
     def objective_value(self):
-        return self.model.objective_value
+        return self.solution.objective
 
     @property
     def disconnected_nodes(self):
-        return [node for node, var in enumerate(self.x) if var.x]
+        return self.solution.disconnected
 
     @property
     def nodes_to_remove(self):
-        return [node for node, var in enumerate(self.y) if var.x]
+        return self.solution.cut
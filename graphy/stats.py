@@ -0,0 +1,54 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+# Class that records what a solver did for one network: how the answer was found, the size of the model and
+# where the time went (building the model, searching and reading the solution back)
+class SolverStats:
+    def __init__(self):
+        self.engine = None  # "cache", "pool", "reduction", "dp", "maxflow" or "mip"
+        self.status = None
+        self.objective = None
+        self.gap = None
+        self.variables = 0
+        self.constraints = 0
+        self.build_time = 0.0
+        self.solve_time = 0.0
+        self.extract_time = 0.0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+# Listeners of the current thread, called with the stats of every solve (each session of the app has its own)
+local = threading.local()
+
+# Function that calls the callbacks of a solver and the listeners of the current thread with its stats
+def publish(stats, callbacks=()):
+    for callback in list(callbacks) + getattr(local, "listeners", []):
+        callback(stats)
+
+# Context manager that collects the stats of every solve made by the current thread inside the block
+@contextmanager
+def collect_stats():
+    records = []
+    local.listeners = getattr(local, "listeners", []) + [records.append]
+
+    try:
+        yield records
+    finally:
+        local.listeners = [listener for listener in local.listeners if listener != records.append]
+
+# Class that adds up the time spent in named sections, as in: with stopwatch("solve"): ...
+class Stopwatch:
+    def __init__(self):
+        self.times = {}
+
+    @contextmanager
+    def __call__(self, name):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - start
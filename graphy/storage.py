@@ -0,0 +1,103 @@
+import os
+import numpy as np
+from .network import GridNetwork, as_grid, kinds
+
+
+# Arrays of a GridNetwork with one entry per node and per edge (the CSR adjacency has 2 entries per edge)
+node_fields = ("role", "endurance", "supplied", "node_alive")
+edge_fields = ("tails", "heads", "red", "edge_alive")
+csr_fields = ("indices", "edge_ids")
+mask_fields = ("role", "supplied", "node_alive", "edge_alive")  # arrays that networks change in place
+
+no_seed = -1  # seeds that are not integers (as None) are not stored, and negative seeds are never valid
+
+
+# Function that stores the seed of a network as an integer
+def seed_code(seed):
+    return int(seed) if isinstance(seed, (int, np.integer)) and seed >= 0 else no_seed
+
+# Function that builds a network from its arrays without copying them or computing its adjacency again
+def assemble(kind, shape, seed, arrays):
+    network = object.__new__(GridNetwork)
+    network.__setstate__(dict(arrays, kind=kind, shape=tuple(shape), n=int(shape[0])*int(shape[1]),
+                              seed=None if seed == no_seed else int(seed)))
+
+    return network
+
+# Function that saves a network (GridNetwork or networkx graph) to a compressed NPZ file
+# Only the arrays are written, so the images attached to the nodes of a plotted graph are left out
+def save_network(path, network):
+    network = as_grid(network)
+    fields = node_fields + edge_fields + csr_fields + ("indptr",)
+
+    np.savez_compressed(path, kind=np.int8(kinds.index(network.kind)), shape=np.array(network.shape),
+                        seed=np.int64(seed_code(network.seed)), **{name : getattr(network, name) for name in fields})
+
+def load_network(path):
+    with np.load(path) as data:
+        arrays = {name : data[name] for name in data.files if name not in ("kind", "shape", "seed")}
+        return assemble(kinds[int(data["kind"])], data["shape"].tolist(), int(data["seed"]), arrays)
+
+# Function that saves many networks as a corpus: a directory with one NPY file per field, where the arrays
+# of all networks are concatenated and offsets tell where each network starts
+# NPY files (unlike NPZ archives) can be memory mapped, so a corpus is loaded without reading it
+def save_corpus(path, networks):
+    os.makedirs(path, exist_ok=True)
+    networks = [as_grid(network) for network in networks]
+
+    columns = {"kind" : np.array([kinds.index(network.kind) for network in networks], dtype=np.int8),
+               "shape" : np.array([network.shape for network in networks], dtype=np.int32).reshape(-1, 2),
+               "seed" : np.array([seed_code(network.seed) for network in networks], dtype=np.int64),
+               "node_offsets" : np.r_[0, np.cumsum([network.n for network in networks])].astype(np.int64),
+               "edge_offsets" : np.r_[0, np.cumsum([len(network.tails) for network in networks])].astype(np.int64)}
+
+    for name in node_fields + edge_fields + csr_fields + ("indptr",):
+        columns[name] = np.concatenate([getattr(network, name) for network in networks] or [np.zeros(0, np.int32)])
+
+    for name, values in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+
+# Class that reads the networks of a corpus saved by save_corpus
+# With mmap the files are mapped, so every process shares the pages of the structure arrays (edges, adjacency,
+# endurances), while the masks changed by removals and interruptions are copied for each network read
+class NetworkCorpus:
+    def __init__(self, path, mmap=True):
+        self.path = path
+
+        names = ("kind", "shape", "seed", "node_offsets", "edge_offsets", "indptr")
+        self.columns = {name : np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                        for name in names + node_fields + edge_fields + csr_fields}
+
+        # Small per network columns are read at once, the large ones stay mapped
+        for name in ("kind", "shape", "seed", "node_offsets", "edge_offsets"):
+            self.columns[name] = np.array(self.columns[name])
+
+    def __len__(self):
+        return len(self.columns["kind"])
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(f"corpus index {i} out of range")
+        i %= len(self)
+
+        columns = self.columns
+        nodes = slice(*columns["node_offsets"][i:i + 2].tolist())
+        edges = slice(*columns["edge_offsets"][i:i + 2].tolist())
+        entries = slice(2*edges.start, 2*edges.stop)
+
+        arrays = {name : columns[name][nodes] for name in node_fields}
+        arrays.update({name : columns[name][edges] for name in edge_fields})
+        arrays.update({name : columns[name][entries] for name in csr_fields})
+        arrays["indptr"] = columns["indptr"][nodes.start + i:nodes.stop + i + 1]  # n + 1 entries per network
+
+        for name in mask_fields:
+            arrays[name] = np.array(arrays[name])
+
+        return assemble(kinds[int(columns["kind"][i])], columns["shape"][i].tolist(), int(columns["seed"][i]),
+                        arrays)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+def load_corpus(path, mmap=True):
+    return NetworkCorpus(path, mmap)
@@ -1,71 +1,159 @@
-import networkx as nx
+import io
+import hashlib
+from collections import OrderedDict
+import numpy as np
 import matplotlib.pyplot as plt
-from .constants import images, pos
+from matplotlib.collections import LineCollection
+from .constants import image
+from .layout import grid_layout
+from .network import GridNetwork, as_grid, roles
 
 
-# Auxiliary function to plot a water distribution network
-def plot_water_network(G):
-    fig, ax = plt.subplots(figsize=(17, 15))
+# Drawing settings
+figsize = (17, 15)
+dpi = 100
+label_limit = 250  # edge labels are only drawn for networks with at most this number of edges
+png_cache_size = 32  # number of rendered networks kept in memory
 
-    nx.draw_networkx_edges(G, pos, width=6, edge_color=nx.get_edge_attributes(G, "color").values())
-    nx.draw_networkx_edge_labels(G, pos, {edge : edge for edge in G.edges})
+png_cache = OrderedDict()
 
-    tr_figure = ax.transData.transform
-    tr_axes = fig.transFigure.inverted().transform
 
-    icon_size = (ax.get_xlim()[1] - ax.get_xlim()[0]) * 0.005
-    icon_center = icon_size / 2.0
+# Function that draws a network of the generator with all icons blitted into a single image
+# names and scales give the icon of each alive node and its size as a fraction of the distance between cells
+def draw_network(network, names, scales, edge_colors):
+    pos = grid_layout(*network.shape)
+    nodes = network.nodes
+    alive = network.edge_alive
 
-    for n, image in G.nodes.data("image"):
-        xf, yf = tr_figure(pos[n])
-        xa, ya = tr_axes((xf, yf))
+    fig = plt.figure(figsize=figsize, dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.axis("off")
 
-        a = plt.axes([xa - icon_center, ya - icon_center, icon_size, icon_size])
+    # Limits with a margin of one cell, widened so that one data unit has the same size in both directions
+    width, height = int(figsize[0]*dpi), int(figsize[1]*dpi)
+    spacing = 2 / max(max(network.shape) - 1, 1)
+    low, high = pos.min(axis=0) - spacing, pos.max(axis=0) + spacing
+
+    resolution = min(width / (high[0] - low[0]), height / (high[1] - low[1]))  # pixels by data unit
+    center = (low + high) / 2
+    xmin, xmax = center[0] - width/resolution/2, center[0] + width/resolution/2
+    ymin, ymax = center[1] - height/resolution/2, center[1] + height/resolution/2
+    cell = spacing*resolution  # pixels between adjacent cells
+
+    # Edges as a single collection, thinner when the cells get close
+    segments = np.stack([pos[network.tails[alive]], pos[network.heads[alive]]], axis=1)
+    ax.add_collection(LineCollection(segments, colors=np.asarray(edge_colors)[alive],
+                                     linewidths=min(6, max(0.5, 0.05*cell)), zorder=1))
+
+    # Level of detail: labels are unreadable (and slow) for large networks
+    if len(segments) <= label_limit:
+        for (v, w), ((x1, y1), (x2, y2)) in zip(network.edge_list(), segments):
+            ax.text((x1 + x2)/2, (y1 + y2)/2, str((v, w)), size=10, ha="center", va="center",
+                    rotation=90 if x1 == x2 else 0, zorder=3,
+                    bbox=dict(boxstyle="round", ec=(1.0, 1.0, 1.0), fc=(1.0, 1.0, 1.0)))
+
+    # Icons are pasted group by group into one RGBA layer with vectorized indexing
+    canvas = np.zeros((height, width, 4), dtype=np.uint8)
+    cx = (pos[nodes, 0] - xmin)*resolution
+    cy = (ymax - pos[nodes, 1])*resolution
+
+    for name, scale in sorted(set(zip(names, scales))):
+        members = np.flatnonzero((names == name) & (scales == scale))
+        size = max(2, int(scale*cell))
+        icon = image(name, size)
+
+        top = np.clip((cy[members] - size/2).astype(int), 0, height - size)
+        left = np.clip((cx[members] - size/2).astype(int), 0, width - size)
+        rows = top[:, None, None] + np.arange(size)[None, :, None]
+        cols = left[:, None, None] + np.arange(size)[None, None, :]
+
+        canvas[rows, cols] = np.where(icon[..., 3:] > 0, icon, canvas[rows, cols])
+
+    # The layer matches the pixels of the figure, so it is composited without any resampling
+    fig.figimage(canvas, zorder=2, origin="upper")
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylim(ymin, ymax)
 
-        a.imshow(image)
-        a.axis("off")
+    return fig
 
-    ax.axis("off")
+# Auxiliary function to plot a water distribution network
+def plot_water_network(G):
+    network = as_grid(G)
+    nodes = network.nodes
+    props = network.role[nodes]
 
-    return fig
+    # Origin and destination keep their icons while they have flow
+    names = np.where(network.supplied[nodes], "node_water", "node").astype(object)
+    for prop in ("origin", "dest"):
+        names[(props == roles.index(prop)) & network.supplied[nodes]] = prop
+
+    edge_colors = np.where(network.red, "red", "blue")
+
+    return draw_network(network, names, np.full(len(nodes), 0.16), edge_colors)
 
 # Auxiliary function to plot a military distribution network
 def plot_military_network(G):
-    fig, ax = plt.subplots(figsize=(17, 15))
+    network = as_grid(G)
+    nodes = network.nodes
+    headquarters = network.role[nodes] == roles.index("headquarters")
 
-    nx.draw_networkx_edges(G, pos, width=6, edge_color="blue")
-    nx.draw_networkx_edge_labels(G, pos, {edge : edge for edge in G.edges})
+    names = np.array([f"base_{min(e, 3)}" for e in network.endurance[nodes].tolist()], dtype=object)
+    names[headquarters] = "headquarters"
+    scales = np.where(headquarters, 0.6, 0.3)
 
-    tr_figure = ax.transData.transform
-    tr_axes = fig.transFigure.inverted().transform
+    return draw_network(network, names, scales, np.full(len(network.red), "blue"))
 
-    icon_size = (ax.get_xlim()[1] - ax.get_xlim()[0]) * 0.01
-    icon_center = icon_size / 2.0
+# Function that hashes everything that changes the drawing of a network
+def state_hash(network):
+    digest = hashlib.sha1(f"{network.kind}{network.shape}".encode())
 
-    for n, node in G.nodes.items():
-        xf, yf = tr_figure(pos[n])
-        xa, ya = tr_axes((xf, yf))
+    for array in (network.tails, network.heads, network.red, network.role, network.endurance,
+                  network.supplied, network.node_alive, network.edge_alive):
+        digest.update(np.ascontiguousarray(array).tobytes())
 
-        if node["node_prop"] == "headquarters":
-            a = plt.axes([xa - 2*icon_center, ya - 2*icon_center, 2*icon_size, 2*icon_size])
-        else:
-            a = plt.axes([xa - icon_center, ya - icon_center, icon_size, icon_size])
+    return digest.hexdigest()
 
-        a.imshow(node["image"])
-        a.axis("off")
+# Function that renders a network to PNG bytes, reusing the bytes of networks drawn before in the same state
+def render_png(G, plot):
+    network = as_grid(G)
+    key = (plot.__name__, state_hash(network))
 
-    ax.axis("off")
+    if key in png_cache:
+        png_cache.move_to_end(key)
+        return png_cache[key]
 
-    return fig
+    fig = plot(network)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, pil_kwargs={"compress_level" : 1})
+    plt.close(fig)
+
+    png_cache[key] = buffer.getvalue()
+    if len(png_cache) > png_cache_size:
+        png_cache.popitem(last=False)
+
+    return png_cache[key]
+
+def water_network_png(G):
+    return render_png(G, plot_water_network)
+
+def military_network_png(G):
+    return render_png(G, plot_military_network)
 
 # Function to update the flow at the vertices of a water distribution network
 def interrupt_flow(G, nodes):
+    if isinstance(G, GridNetwork):
+        G.interrupt(nodes)
+        return
+
     for node in nodes:
         G.nodes[node]["flow"] = False
-        G.nodes[node]["image"] = images["node"]
 
 # Function to update the provided attribute at the vertices of a military distribution network
 def interrupt_supply(G, nodes):
+    if isinstance(G, GridNetwork):
+        G.interrupt(nodes)
+        return
+
     for node in nodes:
         if node in G.nodes:
             G.nodes[node]["provided"] = False
@@ -1,15 +1,22 @@
 import streamlit as st
-import networkx as nx
-from graphy.utils import plot_water_network, interrupt_flow
+from graphy.flow import DynamicCut
+from graphy.stats import Stopwatch
+from graphy.utils import water_network_png, interrupt_flow
 
 
 # Initial page settings
 st.set_page_config(page_title="Water Distribution Network", layout="centered")
 
+# Constants
+MAX_SECONDS = 10  # longest wait for the solver, after which the best cut found so far is used
+
 # Getting variables that will be used
-generator = st.session_state.generator
+water_pool = st.session_state.water_pool
 water_network = st.session_state.water_network
 water_solver = st.session_state.water_solver
+water_cut = st.session_state.water_cut
+
+stopwatch = Stopwatch()  # time spent by each stage of this rerun
 
 # Auxiliary functions
 def disabled_attempts():
@@ -23,19 +30,34 @@ colside1.markdown("### ⚙️ Options")
 if colside2.button("Update"):
     st.session_state.disabled = False
 
-    water_network = st.session_state.water_network = generator.water_network()
+    with stopwatch("generate"):
+        water_network, st.session_state.water_solution = water_pool.pop()  # already solved in the background
+        water_network = st.session_state.water_network = water_network.to_networkx()
+        water_cut = st.session_state.water_cut = DynamicCut(water_network)
 
 if colside3.button("Solve"):
     st.session_state.disabled = True
 
-    water_solver.create_model(water_network)
-    water_solver.optimize()
-    
-    water_network.remove_edges_from(water_solver.edges_to_remove)  # removing edges obtained by the model    
-    interrupt_flow(water_network, water_solver.disconnected_nodes)  # updating the flow on nodes
-    
-    st.sidebar.info(f"Solver removed {water_solver.objective_value} edges\
-                      to disconnect destination supply from origin", icon="ℹ️")   
+    try:
+        with stopwatch("solve"):
+            if st.session_state.water_solution is not None:  # the network has not changed since the pool solved it
+                water_solver.use_solution(st.session_state.water_solution)
+            else:
+                water_solver.create_model(water_network)
+                water_solver.optimize(max_seconds=MAX_SECONDS)
+    except TimeoutError:  # no cut was found within the time limit, so the network is left as it is
+        st.sidebar.error(f"Time limit of {MAX_SECONDS} seconds reached before any cut was found", icon="⏱️")
+    else:
+        water_network.remove_edges_from(water_solver.edges_to_remove)  # removing edges obtained by the model    
+        st.session_state.water_solution = None
+        water_cut.remove_edges_from(water_solver.edges_to_remove)
+        interrupt_flow(water_network, water_solver.disconnected_nodes)  # updating the flow on nodes
+        
+        st.sidebar.info(f"Solver removed {water_solver.objective_value} edges\
+                          to disconnect destination supply from origin", icon="ℹ️")   
+
+        if water_solver.stats.status != "optimal":
+            st.sidebar.warning(f"Time limit of {MAX_SECONDS} seconds reached, this cut may not be optimal", icon="⏱️")
 
 # User entries
 with st.sidebar:
@@ -45,28 +67,21 @@ with st.sidebar:
                              disabled=st.session_state.disabled, help="Pipes chosen to be removed from the network")
 
     if form.form_submit_button("Try", on_click=disabled_attempts):
-        # Saving information about the optimal solution
-        water_solver.create_model(water_network)
-        water_solver.optimize()
+        # The maximum flow kept by water_cut is the optimal solution for the network before the attempt, and
+        # it is repaired pipe by pipe while the attempt is performed
+        with stopwatch("evaluate"):
+            optimum = water_cut.value
+            water_cut.remove_edges_from(edges)
 
         # Perform user attempt
+        interrupt_flow(water_network, water_cut.disconnected_nodes)
         water_network.remove_edges_from(edges)
-    
-        for c in map(water_network.subgraph, nx.connected_components(water_network)):
-            if "origin" not in nx.get_node_attributes(c, "node_prop").values():
-                interrupt_flow(water_network, c.nodes)
-
-        # Checking:
-        # if the user has completed the objective
-        # difference between user solution and integer programming model solution
-        win = False
-        for _, node_dict in water_network.nodes.items():
-            if node_dict["node_prop"] == "dest" and node_dict["flow"] == False:
-                win = True
-                break
-
-        if win:
-            solution_gap = len(edges) - water_solver.objective_value
+        st.session_state.water_solution = None
+
+        # Checking if the user has completed the objective and the difference between user solution and
+        # integer programming model solution
+        if not water_cut.supplied[water_cut.dest]:
+            solution_gap = len(edges) - optimum
 
             st.success("You have successfully stopped provisioning from the origin to the destination", icon="✅")
             st.balloons()  # congratulating user who managed to accomplish the goal
@@ -97,7 +112,16 @@ with the optimal solution obtained by integer programming.
 </h6>
 """, unsafe_allow_html=True)
 
-st.pyplot(plot_water_network(water_network))
+with stopwatch("render"):
+    st.image(water_network_png(water_network), use_column_width=True)
+
+# Timing panel of this rerun, with the stats of the last solve
+with st.sidebar.expander("⏱️ Timings"):
+    for stage, seconds in stopwatch.times.items():
+        st.write(f"{stage}: {seconds*1000:.1f} ms")
+
+    if water_solver.stats is not None:
+        st.json(water_solver.stats.as_dict())
 
 with st.expander("**More information**"):
     st.write(r"""
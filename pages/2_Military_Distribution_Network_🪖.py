@@ -1,6 +1,7 @@
 import streamlit as st
-import networkx as nx
-from graphy.utils import plot_military_network, interrupt_supply
+from graphy.evaluate import CutEvaluator
+from graphy.stats import Stopwatch
+from graphy.utils import military_network_png, interrupt_supply
 
 
 # Initial page settings
@@ -8,19 +9,29 @@ st.set_page_config(page_title="Military Distribution Network", layout="centered"
 
 # Constants
 FIRE_POWER = 6
+MAX_SECONDS = 10  # longest wait for the solver, after which the best attack found so far is used
 
 # Auxiliary functions
 def disabled_attempts():
     st.session_state.disabled = True
 
+def solve_network():
+    if st.session_state.military_solution is not None:  # the network has not changed since the pool solved it
+        military_solver.use_solution(st.session_state.military_solution)
+    else:
+        military_solver.create_model(military_network, FIRE_POWER)
+        military_solver.optimize(max_seconds=MAX_SECONDS)
+
 def sum_endurance(network, nodes):
     return sum(network.nodes[node]["endurance"] for node in nodes)
 
 # Getting variables that will be used
-generator = st.session_state.generator
+military_pool = st.session_state.military_pool
 military_network = st.session_state.military_network
 military_solver = st.session_state.military_solver
 
+stopwatch = Stopwatch()  # time spent by each stage of this rerun
+
 # Sidebar features
 colside1, colside2, colside3 = st.sidebar.columns((4.6, 2.9, 2.5))
 
@@ -29,19 +40,28 @@ colside1.markdown("### ⚙️ Options")
 if colside2.button("Update"):
     st.session_state.disabled = False
 
-    military_network = st.session_state.military_network = generator.military_network()
+    with stopwatch("generate"):
+        military_network, st.session_state.military_solution = military_pool.pop()  # already solved in the background
+        military_network = st.session_state.military_network = military_network.to_networkx()
 
 if colside3.button("Solve"):
     st.session_state.disabled = True
 
-    military_solver.create_model(military_network, FIRE_POWER)
-    military_solver.optimize()
-
-    military_network.remove_nodes_from(military_solver.nodes_to_remove)  # removing nodes obtained by the model
-    interrupt_supply(military_network, military_solver.disconnected_nodes)  # update the provided attribute
-
-    st.sidebar.info(f"Solver stopped provisioning {military_solver.objective_value} \
-                      military units from headquarters", icon="ℹ️")   
+    try:
+        with stopwatch("solve"):
+            solve_network()
+    except TimeoutError:  # no attack was found within the time limit, so the network is left as it is
+        st.sidebar.error(f"Time limit of {MAX_SECONDS} seconds reached before any attack was found", icon="⏱️")
+    else:
+        military_network.remove_nodes_from(military_solver.nodes_to_remove)  # removing nodes obtained by the model
+        st.session_state.military_solution = None
+        interrupt_supply(military_network, military_solver.disconnected_nodes)  # update the provided attribute
+
+        st.sidebar.info(f"Solver stopped provisioning {military_solver.objective_value} \
+                          military units from headquarters", icon="ℹ️")   
+
+        if military_solver.stats.status != "optimal":
+            st.sidebar.warning(f"Time limit of {MAX_SECONDS} seconds reached, this attack may not be optimal", icon="⏱️")
     
 # User entries
 with st.sidebar:
@@ -55,31 +75,35 @@ with st.sidebar:
     if form.form_submit_button("Try", on_click=disabled_attempts):
         # Checking if the firepower limit was violated
         if sum_endurance(military_network, nodes) <= FIRE_POWER:
-            # Saving information about the optimal solution
-            military_solver.create_model(military_network, FIRE_POWER)
-            military_solver.optimize()
+            # Saving information about the optimal solution (without one, the attempt is only checked)
+            optimum = None
+            try:
+                with stopwatch("solve"):
+                    solve_network()
+                optimum = military_solver.objective_value
+            except TimeoutError:
+                st.warning(f"Time limit of {MAX_SECONDS} seconds reached before any attack was found, "
+                           "so your attempt is not compared with the solver", icon="⏱️")
+
+            # Checking the user attempt before changing the network:
+            # if the user has completed the objective
+            # difference between user solution and integer programming model solution
+            with stopwatch("evaluate"):
+                evaluator = CutEvaluator(military_network, FIRE_POWER, optimum=optimum)
+                result = evaluator.evaluate([nodes])
 
             # Perform user attempt
             military_network.remove_nodes_from(nodes)
+            st.session_state.military_solution = None
 
-            # Checking:
-            # if the user has completed the objective
-            # difference between user solution and integer programming model solution
-            win = False
-            solution = 0
-            for c in map(military_network.subgraph, nx.connected_components(military_network)):
-                if "headquarters" not in nx.get_node_attributes(c, "node_prop").values():
-                    win = True
-                    solution += c.number_of_nodes()
-
-            if win:
-                solution += len(nodes)
-                solution_gap = military_solver.objective_value - solution
+            if result["disconnected"][0]:
+                solution = int(result["value"][0])
+                solution_gap = result["gap"][0]
 
                 st.success(f"You have successfully stopped provisioning {solution} military units from headquarters", icon="✅")
                 st.balloons()  # congratulating user who managed to accomplish the goal
                 
-                if solution_gap:
+                if solution_gap > 0:  # nan when the optimum is not known
                     st.warning(f"Your solution was worse than the optimum by {solution_gap} units", icon="⚠️")
             else:
                 st.error("You failed to stop provisioning any military units!", icon="🚨")
@@ -115,7 +139,16 @@ the optimal solution obtained by integer programming.
 </h6>
 """, unsafe_allow_html=True)
 
-st.pyplot(plot_military_network(military_network))
+with stopwatch("render"):
+    st.image(military_network_png(military_network), use_column_width=True)
+
+# Timing panel of this rerun, with the stats of the last solve
+with st.sidebar.expander("⏱️ Timings"):
+    for stage, seconds in stopwatch.times.items():
+        st.write(f"{stage}: {seconds*1000:.1f} ms")
+
+    if military_solver.stats is not None:
+        st.json(military_solver.stats.as_dict())
 
 with st.expander("**More information**"):
     st.write(r"""
@@ -0,0 +1,51 @@
+import functools
+import random
+import networkx as nx
+import pytest
+from graphy.generator import GraphGenerator
+from graphy.solvers import SolverMilitaryDistribution
+
+
+# Instances where the lazy constraints of CBC lost the optimal attack, and others drawn at random
+reported = [(64, 9, 9), (81, 17, 6), (81, 7, 6), (64, 33, 6)]
+
+rng = random.Random(22)
+drawn = [(rng.choice([36, 49, 64]), rng.randrange(1000), rng.choice([6, 9])) for _ in range(12)]
+
+
+def solve(G, fire_power, **options):
+    solver = SolverMilitaryDistribution(engine="mip", **options)
+    solver.create_model(G, fire_power)
+    solver.model.verbose = 0
+    solver.optimize()
+
+    return solver
+
+@functools.lru_cache(maxsize=None)
+def compact_value(N, seed, fire_power):
+    solver = solve(GraphGenerator(N, seed).military_network(), fire_power, formulation="compact")
+    assert solver.stats.status == "optimal"
+
+    return solver.objective_value
+
+@pytest.mark.parametrize("presolve", [False, True])
+@pytest.mark.parametrize("warm_start", [True, False])
+@pytest.mark.parametrize("N, seed, fire_power", reported + drawn)
+def test_lazy_path_cuts_match_the_compact_model(N, seed, fire_power, warm_start, presolve):
+    G = GraphGenerator(N, seed).military_network()
+    lazy = solve(G, fire_power, formulation="lazy", warm_start=warm_start, presolve=presolve)
+
+    assert lazy.stats.status == "optimal"
+    assert lazy.objective_value == compact_value(N, seed, fire_power)
+
+    # The attack found with the path constraints is affordable and disconnects the units it claims
+    attack = lazy.nodes_to_remove
+    headquarters = next(v for v, p in G.nodes.data("node_prop") if p == "headquarters")
+
+    F = G.copy()
+    F.remove_nodes_from(attack)
+    supplied = nx.node_connected_component(F, headquarters)
+
+    assert sum(G.nodes[v]["endurance"] for v in attack) <= fire_power
+    assert sorted(lazy.disconnected_nodes) == sorted(set(G) - supplied)
+    assert len(lazy.disconnected_nodes) == lazy.objective_value
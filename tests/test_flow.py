@@ -0,0 +1,107 @@
+import random
+import networkx as nx
+import pytest
+from graphy.flow import DynamicCut, GomoryHuTree
+from graphy.generator import GraphGenerator
+
+
+# Function that gives the pipes with their capacities, where red pipes can never be cut (networkx does not take
+# paths of infinite capacity, so they get a capacity larger than any cut of blue pipes)
+def capacitated(G):
+    H = nx.Graph()
+    H.add_nodes_from(G)
+    H.add_edges_from((v, w, {"capacity" : G.number_of_edges() + 1 if c == "red" else 1})
+                     for v, w, c in G.edges.data("color"))
+
+    return H
+
+def min_cut_value(H, u, v):
+    value = nx.minimum_cut_value(H, u, v)
+    return float("inf") if value > H.number_of_edges() else value
+
+def find(G, prop):
+    return next(v for v, p in G.nodes.data("node_prop") if p == prop)
+
+
+@pytest.mark.parametrize("N, seed", [(25, 0), (36, 1), (49, 2)])
+def test_gomory_hu_tree_gives_every_minimum_cut(N, seed):
+    G = GraphGenerator(N, seed).water_network()
+    H = capacitated(G)
+    tree = GomoryHuTree(G)
+    nodes = list(G)
+
+    for i, u in enumerate(nodes):
+        for v in nodes[i + 1:]:
+            value = min_cut_value(H, u, v)
+            assert tree.min_cut_value(u, v) == value
+
+            if value == float("inf"):
+                with pytest.raises(ValueError):
+                    tree.min_cut(u, v)
+                continue
+
+            # The pipes given by the tree are a cut of that value
+            cut_value, cut = tree.min_cut(u, v)
+            F = G.copy()
+            F.remove_edges_from(cut)
+
+            assert cut_value == value == len(cut)
+            assert not nx.has_path(F, u, v)
+
+@pytest.mark.parametrize("N, seed", [(25, 0), (49, 1)])
+def test_gomory_hu_tree_matches_networkx(N, seed):
+    # Both trees hold the same minimum cuts, even if their edges differ
+    G = GraphGenerator(N, seed).water_network()
+    H = capacitated(G)
+    tree = GomoryHuTree(G)
+    reference = nx.gomory_hu_tree(H)
+    nodes = list(G)
+
+    def lightest(u, v):
+        path = nx.shortest_path(reference, u, v)
+        value = min(reference[a][b]["weight"] for a, b in zip(path, path[1:]))
+        return float("inf") if value > G.number_of_edges() else value
+
+    matrix = tree.matrix()
+    for i, u in enumerate(nodes):
+        for v in nodes[i + 1:]:
+            assert tree.min_cut_value(u, v) == lightest(u, v) == matrix[u, v] == matrix[v, u]
+
+@pytest.mark.parametrize("N, seed", [(25, 0), (49, 1), (100, 2)])
+def test_dynamic_cut_follows_removals(N, seed):
+    G = GraphGenerator(N, seed).water_network()
+    cut = DynamicCut(G)
+    origin, dest = find(G, "origin"), find(G, "dest")
+
+    blue = [(v, w) for v, w, c in G.edges.data("color") if c == "blue"]
+    random.Random(seed).shuffle(blue)
+
+    for removed in range(len(blue) + 1):
+        if removed:
+            G.remove_edge(*blue[removed - 1])
+            cut.remove_edge(*blue[removed - 1])
+
+        supplied = nx.node_connected_component(G, origin)
+        assert sorted(cut.disconnected_nodes) == sorted(set(G) - supplied)
+        assert cut.supplied[dest] == (dest in supplied)
+
+        value = min_cut_value(capacitated(G), origin, dest)
+        if value == float("inf"):  # joined by red pipes only
+            assert cut.value > G.number_of_edges()
+            continue
+
+        # The pipes of the minimum cut separate the destination from the origin
+        assert cut.value == value == len(cut.min_cut())
+
+        F = G.copy()
+        F.remove_edges_from(cut.min_cut())
+        assert not nx.has_path(F, origin, dest)
+
+def test_dynamic_cut_refuses_removed_pipes():
+    G = GraphGenerator(25, 0).water_network()
+    cut = DynamicCut(G)
+    v, w = next((v, w) for v, w, c in G.edges.data("color") if c == "blue")
+
+    cut.remove_edge(v, w)
+    with pytest.raises(KeyError):
+        cut.remove_edge(w, v)
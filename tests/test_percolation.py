@@ -0,0 +1,82 @@
+import networkx as nx
+import numpy as np
+import pytest
+from graphy.generator import GraphGenerator
+from graphy.percolation import simulate_failures
+
+
+probabilities = [0.1, 0.3, 0.5, 0.7]
+samples = 2000
+tolerance = 0.05  # both estimates have standard errors of about 0.01
+
+
+def find(G, prop):
+    return next(v for v, p in G.nodes.data("node_prop") if p == prop)
+
+# Function that estimates the curves by failing the network sample after sample and searching what is left
+def monte_carlo(G, kind, p, rng):
+    connected, supplied = [], []
+
+    for _ in range(samples):
+        F = G.copy()
+
+        if kind == "water":
+            source, dest = find(G, "origin"), find(G, "dest")
+            F.remove_edges_from([(v, w) for v, w, c in G.edges.data("color")
+                                 if c == "blue" and rng.random() < p])
+            connected.append(nx.has_path(F, source, dest))
+        else:
+            source = find(G, "headquarters")
+            F.remove_nodes_from([v for v in G if v != source and rng.random() < p])
+
+        # Failed units still count in the fraction, as units that are not supplied
+        supplied.append(len(nx.node_connected_component(F, source)) / G.number_of_nodes())
+
+    return np.mean(connected) if connected else None, np.mean(supplied)
+
+@pytest.mark.parametrize("N, seed", [(25, 0), (49, 1)])
+def test_water_curves_match_monte_carlo(N, seed):
+    G = GraphGenerator(N, seed).water_network()
+    curves = simulate_failures(G, scenarios=samples, probabilities=probabilities, seed=seed, workers=1)
+    rng = np.random.default_rng(seed)
+
+    for k, p in enumerate(probabilities):
+        connected, supplied = monte_carlo(G, "water", p, rng)
+
+        assert abs(curves["connected"][k] - connected) < tolerance
+        assert abs(curves["supplied"][k] - supplied) < tolerance
+        assert curves["connected_low"][k] <= curves["connected"][k] <= curves["connected_high"][k]
+
+@pytest.mark.parametrize("N, seed", [(25, 0), (49, 1)])
+def test_military_curves_match_monte_carlo(N, seed):
+    G = GraphGenerator(N, seed).military_network()
+    curves = simulate_failures(G, scenarios=samples, probabilities=probabilities, seed=seed, workers=1)
+    rng = np.random.default_rng(seed)
+
+    assert "connected" not in curves
+    for k, p in enumerate(probabilities):
+        _, supplied = monte_carlo(G, "military", p, rng)
+
+        assert abs(curves["supplied"][k] - supplied) < tolerance
+
+def test_curves_do_not_depend_on_the_workers():
+    G = GraphGenerator(25, 0).water_network()
+    one = simulate_failures(G, scenarios=500, seed=3, workers=1, chunk_size=100)
+    two = simulate_failures(G, scenarios=500, seed=3, workers=2, chunk_size=100)
+
+    for name in one:
+        assert np.allclose(one[name], two[name])
+
+def test_certain_failures():
+    # Nothing fails with probability 0, and only the red pipes are left with probability 1
+    G = GraphGenerator(25, 0).water_network()
+    curves = simulate_failures(G, scenarios=50, probabilities=[0, 1], seed=0, workers=1)
+
+    F = nx.Graph()
+    F.add_nodes_from(G)
+    F.add_edges_from((v, w) for v, w, c in G.edges.data("color") if c == "red")
+    origin = find(G, "origin")
+
+    assert curves["connected"][0] == curves["supplied"][0] == 1
+    assert curves["connected"][1] == nx.has_path(F, origin, find(G, "dest"))
+    assert curves["supplied"][1] == pytest.approx(len(nx.node_connected_component(F, origin)) / G.number_of_nodes())
@@ -0,0 +1,75 @@
+import random
+import networkx as nx
+import pytest
+from graphy.generator import GraphGenerator
+from graphy.solvers import SolverWaterDistribution
+
+
+def find(G, prop):
+    return next(v for v, p in G.nodes.data("node_prop") if p == prop)
+
+# Function that gives the minimum cut of blue pipes between origin and destination (None when red pipes join them)
+def min_cut_value(G):
+    H = nx.Graph()
+    H.add_nodes_from(G)
+    H.add_edges_from((v, w, {"capacity" : G.number_of_edges() + 1 if c == "red" else 1})
+                     for v, w, c in G.edges.data("color"))
+
+    value = nx.minimum_cut_value(H, find(G, "origin"), find(G, "dest"))
+    return None if value > G.number_of_edges() else value
+
+def solve(solver, G):
+    solver.create_model(G)
+    if solver.model is not None:
+        solver.model.verbose = 0
+    solver.optimize()
+
+    return solver
+
+@pytest.mark.parametrize("presolve", [False, True])
+@pytest.mark.parametrize("N, seed", [(N, seed) for seed in range(8) for N in (49, 64, 100)])
+def test_relaxation_follows_pipe_removals(N, seed, presolve):
+    # The same solver answers the network after each batch of removals, as the pages of the app do
+    G = GraphGenerator(N, seed).water_network()
+    relaxed = SolverWaterDistribution(relax=True, presolve=presolve)
+    rng = random.Random(seed)
+
+    while True:
+        value = min_cut_value(G)
+        if value is None:  # only red pipes are left between origin and destination
+            break
+
+        solve(relaxed, G)
+        flow = solve(SolverWaterDistribution(backend="maxflow"), G)
+
+        assert relaxed.stats.status == "optimal"
+        assert relaxed.objective_value == flow.objective_value == value
+        assert len(relaxed.edges_to_remove) == value
+
+        # The cut never goes through a red pipe and separates the destination from the origin
+        assert all(G.edges[e]["color"] == "blue" for e in relaxed.edges_to_remove)
+
+        F = G.copy()
+        F.remove_edges_from(relaxed.edges_to_remove)
+        assert not nx.has_path(F, find(G, "origin"), find(G, "dest"))
+        assert find(G, "dest") in relaxed.disconnected_nodes
+
+        if value == 0:
+            break
+
+        # Some pipes of the cut and some others, so that both the value and the red pipes around it change
+        blue = [(v, w) for v, w, c in G.edges.data("color") if c == "blue"]
+        G.remove_edges_from(rng.sample(relaxed.edges_to_remove, 1) + rng.sample(blue, min(3, len(blue))))
+
+@pytest.mark.parametrize("options", [{"relax" : True}, {"backend" : "maxflow"}])
+def test_answers_without_search_reach_on_incumbent(options):
+    G = GraphGenerator(49, 0).water_network()
+    solver = SolverWaterDistribution(**options)
+    solver.create_model(G)
+    if solver.model is not None:
+        solver.model.verbose = 0
+
+    incumbents = []
+    solver.optimize(on_incumbent=lambda solution, bound, gap: incumbents.append((solution, bound, gap)))
+
+    assert incumbents == [(solver.solution, solver.objective_value, 0.0)]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from graphy.generator import GraphGenerator
+from graphy.network import GridNetwork
+from graphy.storage import save_network, load_network, save_corpus, load_corpus
+
+
+fields = ("tails", "heads", "indptr", "indices", "edge_ids", "role", "endurance", "supplied", "red",
+          "node_alive", "edge_alive")
+
+
+def assert_same(a, b):
+    assert (a.kind, a.shape, a.n, a.seed) == (b.kind, b.shape, b.n, b.seed)
+    for name in fields:
+        assert np.array_equal(getattr(a, name), getattr(b, name)), name
+
+def networks():
+    generator = GraphGenerator(49, 0)
+    return generator.water_grid(3) + generator.military_grid(3)
+
+def test_generated_networks_carry_their_seed():
+    for network in networks():
+        assert isinstance(network.seed, int)
+
+        again = GraphGenerator(49, network.seed)
+        arrays = again.water_arrays() if network.kind == "water" else again.military_arrays()
+        assert_same(network, GridNetwork.from_arrays(arrays, seed=network.seed))
+
+@pytest.mark.parametrize("network", networks(), ids=lambda network: network.kind)
+def test_network_round_trip(tmp_path, network):
+    network.remove_edges_from(network.edge_list()[:2])  # removals are kept too
+
+    save_network(tmp_path / "network.npz", network)
+    loaded = load_network(tmp_path / "network.npz")
+
+    assert_same(network, loaded)
+    assert loaded.seed is not None
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_corpus_round_trip(tmp_path, mmap):
+    saved = networks()
+    save_corpus(tmp_path / "corpus", saved)
+    corpus = load_corpus(tmp_path / "corpus", mmap)
+
+    assert len(corpus) == len(saved)
+    for network, loaded in zip(saved, corpus):
+        assert_same(network, loaded)
+    assert_same(saved[-1], corpus[-1])
+
+    with pytest.raises(IndexError):
+        corpus[len(saved)]
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_corpus_reads_do_not_share_masks(tmp_path, mmap):
+    save_corpus(tmp_path / "corpus", networks())
+    corpus = load_corpus(tmp_path / "corpus", mmap)
+
+    for i in range(len(corpus)):
+        before = corpus[i]
+        network = corpus[i]
+
+        network.remove_edges_from(network.edge_list()[:1])
+        network.remove_nodes_from(network.nodes[-1:].tolist())
+
+        assert_same(corpus[i], before)